@@ -0,0 +1,202 @@
+"""Append-only JSONL record of every challenge attempt
+
+Records are handed to a background thread and written in batches with one
+fsync per batch, so logging an attempt never waits on the disk. Files can be
+gzip-compressed and are rotated by size (attempts.jsonl, attempts.jsonl.1, ...).
+
+    CAPTCHA_ATTEMPT_LOG=attempts.jsonl.gz   # where to log, empty to turn it off
+
+Read them back for offline analysis with read_attempts(path).
+"""
+import atexit
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+import metrics
+
+DEFAULT_PATH = "attempts.jsonl"
+MAX_BYTES = 50 * 1024 * 1024
+BACKUPS = 5
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 1.0     # Seconds a record may wait before its batch is written
+QUEUE_SIZE = 10000
+
+_STOP = object()
+
+
+def _open(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "ab")
+    return open(path, "ab")
+
+
+class AttemptLog:
+    def __init__(self, path=DEFAULT_PATH, max_bytes=MAX_BYTES, backups=BACKUPS,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.errors = 0
+        self.failing = False    # Set while writes keep failing, so we only report it once
+
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.thread = threading.Thread(target=self._run, name="attempt-log", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def log(self, record):
+        """Queue one attempt, never blocks; drops it if the writer has fallen far behind"""
+        record.setdefault("time", time.time())
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc("attempt_log_dropped_total")
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+
+    def _rotate(self, f):
+        f.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        return _open(self.path)
+
+    def _write(self, f, batch):
+        f.write(b"".join(json.dumps(r, default=str).encode() + b"\n" for r in batch))
+        f.flush()
+        os.fsync(f.fileno())
+        metrics.inc("attempt_log_records_total", len(batch))
+
+        if self.max_bytes and os.path.getsize(self.path) >= self.max_bytes:
+            f = self._rotate(f)
+        return f
+
+    def _flush(self, f, batch):
+        """Write a batch, returns the file to use next (None to reopen it next time)"""
+        try:
+            if f is None:
+                f = _open(self.path)
+            with metrics.timer("attempt_log_write_seconds"):
+                f = self._write(f, batch)
+        except OSError as e:
+            # Disk full, permissions, a rotation race... keep the writer alive
+            # and try a fresh file handle on the next batch
+            self.errors += 1
+            self.dropped += len(batch)
+            metrics.inc("attempt_log_errors_total")
+            metrics.inc("attempt_log_dropped_total", len(batch))
+            if not self.failing:
+                print(f"Attempt log: could not write to {self.path}, dropping records until it works again: {e}")
+                self.failing = True
+            if f is not None:
+                try:
+                    f.close()
+                except OSError:
+                    pass
+            return None
+
+        if self.failing:
+            print(f"Attempt log: writing to {self.path} again")
+            self.failing = False
+        return f
+
+    def _run(self):
+        f = None
+        batch = []
+        stopping = False
+
+        while not stopping:
+            # Wait for the first record, then collect whatever else arrives
+            # within flush_interval so they share one write and one fsync
+            item = self.queue.get()
+            deadline = time.monotonic() + self.flush_interval
+
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    item = None
+
+            if batch:
+                f = self._flush(f, batch)
+                batch = []
+
+        if f is not None:
+            f.close()
+
+
+def log_files(path):
+    """Rotated files oldest first, then the live one"""
+    files = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        files.append(f"{path}.{i}")
+        i += 1
+    files.reverse()
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_attempts(path=DEFAULT_PATH, include_rotated=True):
+    """Stream attempt records one at a time, oldest first"""
+    files = log_files(path) if include_rotated else [path]
+    for name in files:
+        opener = gzip.open if path.endswith(".gz") else open
+        try:
+            with opener(name, "rt") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Half-written last line after a crash
+        except EOFError:
+            continue  # Truncated gzip member, keep what we could read
+
+
+_default = None
+
+
+def get_attempt_log():
+    """Shared log for this process, None when CAPTCHA_ATTEMPT_LOG is set to ''"""
+    global _default
+    if _default is None:
+        path = os.environ.get("CAPTCHA_ATTEMPT_LOG", DEFAULT_PATH)
+        if not path:
+            return None
+        _default = AttemptLog(path)
+    return _default
+
+
+def log_attempt(**record):
+    attempt_log = get_attempt_log()
+    if attempt_log is not None:
+        attempt_log.log(record)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Quick summary: python attempt_log.py [attempts.jsonl]
+    total = passed = 0
+    for attempt in read_attempts(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH):
+        total += 1
+        passed += bool(attempt.get("passed"))
+    print(f"{total} attempts, {passed} passed")
@@ -0,0 +1,10 @@
+"""Headless benchmarks for each stage of the challenge pipeline
+
+    python -m benchmarks                          # run everything, print results
+    python -m benchmarks --output results.json    # save machine-readable results
+    python -m benchmarks --compare baseline.json  # fail on regressions
+    python -m benchmarks.soak --rounds 2000       # fail on memory/fd/thread/process leaks
+
+Fixtures live in benchmarks/fixtures and are regenerated with
+python -m benchmarks.make_fixtures (the drawings are copies of real ones).
+"""
@@ -0,0 +1,87 @@
+import argparse
+import functools
+import json
+import platform
+import sys
+import time
+
+from metrics import configure_from_env
+from benchmarks.stages import STAGES, HIGHER_IS_BETTER, NOT_GATED
+
+DEFAULT_TOLERANCE = 0.10
+
+
+def higher_is_better(name):
+    return name in HIGHER_IS_BETTER
+
+
+def compare(metrics, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Print a comparison table, returns the names of metrics that regressed"""
+    regressions = []
+    print(f"\n{'metric':34} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, value in metrics.items():
+        if name not in baseline or not baseline[name]:
+            print(f"{name:34} {'-':>12} {value:>12.3f}")
+            continue
+        if name in NOT_GATED:
+            print(f"{name:34} {baseline[name]:>12.3f} {value:>12.3f}  (not gated)")
+            continue
+        old = baseline[name]
+        change = (value - old) / old
+        worse = -change if higher_is_better(name) else change
+        flag = "  REGRESSED" if worse > tolerance else ""
+        print(f"{name:34} {old:>12.3f} {value:>12.3f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmark each stage of the challenge pipeline")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --output run")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown before a metric counts as a regression")
+    parser.add_argument("--strokes", help="rasterise this stroke log (.json or canvas.py .strk) "
+                                          "instead of the fixture")
+    args = parser.parse_args()
+    configure_from_env()
+
+    stages = dict(STAGES)
+    if args.strokes:
+        stages["raster"] = functools.partial(STAGES["raster"], strokes_path=args.strokes)
+
+    metrics = {}
+    for stage in args.stages:
+        print(f"Running {stage}...")
+        metrics.update(stages[stage]())
+
+    for name, value in metrics.items():
+        print(f"  {name:34} {value:12.3f}")
+
+    results = {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "stages": args.stages},
+               "metrics": metrics}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(metrics, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Regenerate the benchmark fixtures (seeded)
+
+    python -m benchmarks.make_fixtures
+
+The stroke log and landmark stream are pure Python. The captcha drawings come
+from load_generator.py, named <n>_<captcha text>.png so the expected text
+travels with them.
+"""
+import json
+import math
+import os
+import random
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+CANVAS_WIDTH, CANVAS_HEIGHT = 500, 250   # Same as the Tk drawing canvas in main.py
+FPS = 30
+CAPTCHA_DRAWINGS = 12
+
+
+def make_strokes(rng, letters=5):
+    """Wobbly pen strokes, a few per letter cell, as lists of [x, y] points"""
+    strokes = []
+    cell = CANVAS_WIDTH / (letters + 1)
+    for i in range(letters):
+        cx = cell * (i + 1)
+        for _ in range(rng.randint(1, 3)):
+            n = rng.randint(15, 40)
+            phase = rng.uniform(0, 2 * math.pi)
+            points = []
+            for t in range(n):
+                a = phase + t / n * 2 * math.pi
+                x = cx + 25 * math.sin(a) + rng.uniform(-2, 2)
+                y = CANVAS_HEIGHT / 2 + 50 * math.cos(a * rng.choice([1, 2])) + rng.uniform(-2, 2)
+                points.append([round(x, 1), round(y, 1)])
+            strokes.append(points)
+    return strokes
+
+
+def make_hand(rng, label, wrist_x, wrist_y):
+    """21 landmarks of a flat, palm-up hand that passes video.is_valid_hand"""
+    # Thumb towards the body centre for a mirrored, palm-up hand
+    side = -1 if label == "Left" else 1
+    points = [[wrist_x, wrist_y, 0.0] for _ in range(21)]
+    for finger in range(5):
+        base = 1 + finger * 4
+        spread = (finger - 2) * 0.025 * side
+        for joint in range(4):
+            points[base + joint] = [wrist_x - spread * (joint + 1) * 0.6 + rng.uniform(-0.002, 0.002),
+                                    wrist_y - 0.04 * (joint + 1) + rng.uniform(-0.002, 0.002),
+                                    0.0]
+    # Index and pinky knuckles level, so the flatness check passes
+    points[17][1] = points[5][1]
+    return [[round(v, 4) for v in p] for p in points]
+
+
+def make_landmark_stream(rng, seconds=10):
+    """Two hands swapping up and down about twice a second, one JSON object per frame"""
+    frames = []
+    for f in range(seconds * FPS):
+        t = f / FPS
+        swing = 0.12 * math.sin(2 * math.pi * 2 * t)
+        hands = []
+        # Drop a hand now and then, the way the detector does
+        if rng.random() > 0.05:
+            hands.append({"label": "Left", "landmarks": make_hand(rng, "Left", 0.3, 0.6 - swing)})
+            hands.append({"label": "Right", "landmarks": make_hand(rng, "Right", 0.7, 0.6 + swing)})
+        frames.append({"t": round(t, 4), "hands": hands})
+    return frames
+
+
+def make_captcha_drawings(rng, count=CAPTCHA_DRAWINGS):
+    import cv2
+    from load_generator import synthesize
+
+    folder = os.path.join(FIXTURE_DIR, "captchas")
+    os.makedirs(folder, exist_ok=True)
+    for i in range(count):
+        text, image = synthesize(rng)
+        cv2.imwrite(os.path.join(folder, f"{i:02d}_{text}.png"), image)
+
+
+def main(seed=67):
+    rng = random.Random(seed)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+
+    with open(os.path.join(FIXTURE_DIR, "strokes.json"), "w") as f:
+        json.dump({"width": CANVAS_WIDTH, "height": CANVAS_HEIGHT,
+                   "strokes": make_strokes(rng)}, f)
+
+    with open(os.path.join(FIXTURE_DIR, "landmarks.jsonl"), "w") as f:
+        for frame in make_landmark_stream(rng):
+            f.write(json.dumps(frame) + "\n")
+
+    make_captcha_drawings(random.Random(seed))
+
+    print(f"Wrote fixtures to {FIXTURE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
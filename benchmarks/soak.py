@@ -0,0 +1,275 @@
+"""Soak test: run challenge rounds over and over and watch for leaks
+
+    python -m benchmarks.soak --rounds 2000                # headless pipeline
+    python -m benchmarks.soak --rounds 500 --ui            # drive CaptchaApp too (needs a display, xvfb-run works)
+    python -m benchmarks.soak --output soak.jsonl          # keep the per-round samples
+
+Each round generates a captcha, writes and validates a synthetic drawing, runs
+the gesture loop on a stand-in camera and starts and stops the cursor effect
+(a sleeping Python process stands in for the executable). RSS, open file
+descriptors, threads and child processes are sampled after every round. The
+run fails when any of them grew by more than its limit between the start
+(after warm-up) and the end.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+import metrics
+
+FRAME_SHAPE = (480, 640, 3)
+GESTURE_FRAMES = 10
+WARMUP_ROUNDS = 20
+WINDOW = 20              # Rounds averaged (median) at the start and at the end
+
+# Allowed growth from the warmed-up start to the end of the run
+LIMITS = {"rss_mb": 64.0, "fds": 4, "threads": 2, "children": 0}
+
+CURSOR_STAND_IN = [sys.executable, "-c", "import time; time.sleep(3600)"]
+
+
+def sample():
+    """Resource usage of this process right now, None for what can't be read here"""
+    try:
+        import psutil
+        process = psutil.Process()
+        fds = process.num_fds() if hasattr(process, "num_fds") else process.num_handles()
+        return {"rss_mb": process.memory_info().rss / 1024 / 1024, "fds": fds,
+                "threads": process.num_threads(),
+                "children": len(process.children(recursive=True))}
+    except ImportError:
+        pass
+
+    # Linux without psutil
+    usage = {"rss_mb": None, "fds": None, "threads": threading.active_count(), "children": None}
+    try:
+        with open("/proc/self/statm") as f:
+            usage["rss_mb"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+        usage["fds"] = len(os.listdir("/proc/self/fd"))
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    usage["threads"] = int(line.split()[1])
+        pid = str(os.getpid())
+        children = 0
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        # Field 4 is the parent pid, the name before it may contain spaces
+                        children += f.read().rsplit(")", 1)[1].split()[1] == pid
+                except OSError:
+                    continue  # Exited while we were looking
+        usage["children"] = children
+    except OSError:
+        pass
+    return usage
+
+
+class StandInCamera:
+    """cv2.VideoCapture look-alike that hands out fresh noise frames"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        return True, self.rng.integers(0, 256, FRAME_SHAPE, dtype=np.uint8)
+
+    def release(self):
+        self.opened = False
+
+
+class StandInMessagebox:
+    """Replaces tkinter.messagebox so rounds never block on a dialog"""
+    showinfo = showwarning = showerror = staticmethod(lambda *args, **kwargs: "ok")
+
+
+def stand_in_perform_67(rng):
+    from video import perform_67
+    return lambda: perform_67(show=False, capture=StandInCamera(rng), max_frames=GESTURE_FRAMES)
+
+
+class HeadlessRound:
+    """The pipeline CaptchaApp runs, minus Tk"""
+
+    def __init__(self, seed, workdir):
+        from main import CaptchaApp
+
+        # Borrow the app's real cursor handling, it only needs these two attributes
+        class CursorOnly:
+            start_cursor_effect = CaptchaApp.start_cursor_effect
+            stop_cursor_effect = CaptchaApp.stop_cursor_effect
+
+        self.cursor = CursorOnly()
+        self.cursor.cursor_command = CURSOR_STAND_IN
+        self.cursor.cursor_process = None
+        self.rng = random.Random(seed)
+        self.perform_67 = stand_in_perform_67(np.random.default_rng(seed))
+        self.drawing_path = os.path.join(workdir, "my_drawing.png")
+
+    def __call__(self):
+        import cv2
+        from captcha_generator import generate_captcha
+        from load_generator import synthesize
+        from reco_main import validate_writing
+        from attempt_log import log_attempt
+
+        text, _, _ = generate_captcha()
+        self.cursor.start_cursor_effect()
+
+        _, drawing = synthesize(self.rng, text)
+        cv2.imwrite(self.drawing_path, drawing)
+        self.cursor.stop_cursor_effect()
+
+        details = {}
+        passed = validate_writing(self.drawing_path, text, details=details)
+        gesture = self.perform_67() if passed else None
+        log_attempt(target=text, passed=passed, gesture=gesture, **details)
+
+    def close(self):
+        self.cursor.stop_cursor_effect()
+
+
+class UIRound:
+    """Drives a real CaptchaApp, with the camera and dialogs swapped out"""
+
+    def __init__(self, seed, workdir):
+        import tkinter as tk
+        import main
+
+        self.main = main
+        self.saved = main.messagebox, main.perform_67
+        main.messagebox = StandInMessagebox
+        main.perform_67 = stand_in_perform_67(np.random.default_rng(seed))
+
+        # submit_answer writes my_drawing.png next to wherever we run
+        self.cwd = os.getcwd()
+        os.chdir(workdir)
+
+        self.rng = random.Random(seed)
+        self.root = tk.Tk()
+        self.app = main.CaptchaApp(self.root, timing_hook=None, cursor_command=CURSOR_STAND_IN)
+        self.root.update()
+
+    def __call__(self):
+        from load_generator import handwrite
+        from strokes import strokes_to_segments
+
+        app = self.app
+        app.open_canvas()
+        app.start_cursor_effect()   # open_canvas only schedules it
+        self.root.update()
+
+        for x1, y1, x2, y2 in strokes_to_segments(handwrite(app.captcha_text, self.rng)):
+            app.canvas.create_line(x1, y1, x2, y2, fill="white", width=5)
+        app.submit_answer()
+
+        # A failed round stays on the canvas, start over like a new visitor would
+        if app.current_screen != "captcha":
+            app.stop_cursor_effect()
+            app.show_captcha_screen()
+        self.root.update()
+
+    def close(self):
+        self.app.stop_cursor_effect()
+        self.root.destroy()
+        self.main.messagebox, self.main.perform_67 = self.saved
+        os.chdir(self.cwd)
+
+
+def growth(samples, warmup=WARMUP_ROUNDS, window=WINDOW):
+    """End-minus-start of each measure, using medians so one slow round doesn't count"""
+    start = samples[warmup:warmup + window] or samples[:window]
+    end = samples[-window:]
+    result = {}
+    for name in LIMITS:
+        before = [s[name] for s in start if s[name] is not None]
+        after = [s[name] for s in end if s[name] is not None]
+        if before and after:
+            result[name] = statistics.median(after) - statistics.median(before)
+    return result
+
+
+def soak(rounds, ui=False, seed=0, limits=LIMITS, report_every=100, output=None):
+    """Run the rounds, returns (per-round samples, growth, names of exceeded limits)"""
+    workdir = tempfile.mkdtemp(prefix="soak-")
+    # Keep soak rounds out of the real attempt log
+    os.environ["CAPTCHA_ATTEMPT_LOG"] = os.path.join(workdir, "attempts.jsonl")
+    runner = (UIRound if ui else HeadlessRound)(seed, workdir)
+    samples = []
+    out = open(output, "w") if output else None
+
+    try:
+        for i in range(rounds):
+            start = time.perf_counter()
+            runner()
+            usage = sample()
+            usage.update(round=i, seconds=time.perf_counter() - start)
+            samples.append(usage)
+            if out:
+                out.write(json.dumps(usage) + "\n")
+
+            if report_every and (i + 1) % report_every == 0:
+                print(f"round {i + 1:>6}  rss {usage['rss_mb'] or 0:8.1f} MB  fds {usage['fds']}  "
+                      f"threads {usage['threads']}  children {usage['children']}  "
+                      f"{usage['seconds'] * 1000:6.0f} ms")
+    finally:
+        runner.close()
+        if out:
+            out.close()
+        from attempt_log import get_attempt_log
+        get_attempt_log().close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    grown = growth(samples)
+    exceeded = [name for name, value in grown.items() if value > limits[name]]
+    return samples, grown, exceeded
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.soak",
+                                     description="Repeat challenge rounds and fail on resource growth")
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--ui", action="store_true", help="drive CaptchaApp through Tk as well")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report-every", type=int, default=100)
+    parser.add_argument("--output", help="write every round's sample to this JSONL file")
+    for name, limit in LIMITS.items():
+        parser.add_argument(f"--max-{name.replace('_', '-')}", type=type(limit), default=limit,
+                            dest=name, help=f"allowed growth in {name} (default {limit})")
+    args = parser.parse_args()
+    metrics.configure_from_env()
+
+    if args.rounds < WARMUP_ROUNDS + 2 * WINDOW:
+        parser.error(f"need at least {WARMUP_ROUNDS + 2 * WINDOW} rounds to measure growth")
+
+    limits = {name: getattr(args, name) for name in LIMITS}
+    _, grown, exceeded = soak(args.rounds, ui=args.ui, seed=args.seed, limits=limits,
+                              report_every=args.report_every, output=args.output)
+
+    print(f"\n{'measure':10} {'growth':>10} {'limit':>10}")
+    for name, value in grown.items():
+        flag = "  EXCEEDED" if name in exceeded else ""
+        print(f"{name:10} {value:>10.2f} {limits[name]:>10}{flag}")
+    missing = [name for name in LIMITS if name not in grown]
+    if missing:
+        print(f"Could not measure {', '.join(missing)} here (install psutil)")
+
+    if exceeded:
+        print(f"\nResource growth over the limit: {', '.join(exceeded)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
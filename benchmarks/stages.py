@@ -0,0 +1,164 @@
+import glob
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+import numpy as np
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SEGMENT_COUNTS = (100, 1000, 5000)
+
+
+def percentile_ms(seconds, q):
+    return float(np.percentile(np.array(seconds) * 1000, q))
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, None if we can't tell"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS reports bytes
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def load_segments(path=None):
+    """Stroke fixture (or a .strk export from canvas.py) as Tk-style line segments"""
+    from strokes import load_strokes, strokes_to_segments
+
+    if path is not None and path.endswith(".strk"):
+        strokes, width, height = load_strokes(path)
+        return strokes_to_segments(strokes), width, height
+
+    with open(path or os.path.join(FIXTURE_DIR, "strokes.json")) as f:
+        fixture = json.load(f)
+    return strokes_to_segments(fixture["strokes"]), fixture["width"], fixture["height"]
+
+
+def load_landmark_stream():
+    """Recorded frames as (t, hand landmark objects, labels), shaped like MediaPipe output"""
+    frames = []
+    with open(os.path.join(FIXTURE_DIR, "landmarks.jsonl")) as f:
+        for line in f:
+            frame = json.loads(line)
+            hands = [SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z)
+                                               for x, y, z in hand["landmarks"]])
+                     for hand in frame["hands"]]
+            labels = [hand["label"] for hand in frame["hands"]]
+            frames.append((frame["t"], hands, labels))
+    return frames
+
+
+def bench_captcha(rounds=200):
+    from captcha_generator import create_captcha, get_atlas, VALID_CHARACTERS
+
+    atlas = get_atlas()
+    texts = [''.join(random.choices(VALID_CHARACTERS, k=5)) for _ in range(rounds)]
+
+    # Same work as generate_captcha, minus saving captcha.png
+    start = time.perf_counter()
+    for text in texts:
+        create_captcha(text, atlas=atlas if atlas.glyphs else None, fonts=atlas.fonts)
+    return {"captcha.per_s": rounds / (time.perf_counter() - start)}
+
+
+def bench_raster(repeats=20, counts=SEGMENT_COUNTS, strokes_path=None):
+    from rasterize import rasterize_segments
+
+    base, width, height = load_segments(strokes_path)
+    metrics = {}
+    for count in counts:
+        segments = [base[i % len(base)] for i in range(count)]
+        rasterize_segments(segments, width, height)  # Warm up
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            rasterize_segments(segments, width, height)
+            timings.append(time.perf_counter() - start)
+        metrics[f"raster.{count}_segments_ms"] = percentile_ms(timings, 50)
+    return metrics
+
+
+def bench_ocr(repeats=5, **validator_options):
+    import cv2
+    from validator import StrictValidator
+
+    images = [cv2.imread(path) for path in
+              sorted(glob.glob(os.path.join(FIXTURE_DIR, "drawings", "*.png")))]
+
+    start = time.perf_counter()
+    validator = StrictValidator(**validator_options)
+    load_time = time.perf_counter() - start
+
+    validator.validate(images[0], "bench")  # Warm up
+    timings = []
+    for _ in range(repeats):
+        for image in images:
+            start = time.perf_counter()
+            validator.validate(image, "bench")
+            timings.append(time.perf_counter() - start)
+
+    metrics = {"ocr.load_s": load_time,
+               "ocr.p50_ms": percentile_ms(timings, 50),
+               "ocr.p99_ms": percentile_ms(timings, 99)}
+    rss = peak_rss_mb()
+    if rss is not None:
+        metrics["ocr.peak_rss_mb"] = rss
+    return metrics
+
+
+def bench_gesture(loops=20):
+    """Per-frame gesture logic from perform_67 on recorded landmarks (no camera, no MediaPipe)
+
+    Only the Python bookkeeping after Hands.process, so gesture_logic.fps says
+    nothing about the live loop, where MediaPipe inference dominates.
+    """
+    from video import SwapCounter, is_valid_hand, wrists
+
+    frames = load_landmark_stream()
+    detections = 0
+    processed = 0
+
+    start = time.perf_counter()
+    for loop in range(loops):
+        offset = loop * (frames[-1][0] + 1)
+        counter = SwapCounter(now=offset)
+        for t, hands, labels in frames:
+            processed += 1
+            if len(hands) != 2:
+                continue
+            if not all(is_valid_hand(hl, lbl)[0] for hl, lbl in zip(hands, labels)):
+                continue
+            left_w, right_w = wrists(hands, labels)
+            if left_w and right_w:
+                counter.update(left_w.y, right_w.y, now=offset + t)
+                if counter.done:
+                    detections += 1
+                    counter = SwapCounter(now=offset + t)
+    elapsed = time.perf_counter() - start
+
+    return {"gesture_logic.fps": processed / elapsed,
+            "gesture_logic.detections_per_stream": detections / loops}
+
+
+# Direction of every metric for --compare. Anything not listed here is a
+# time or a memory size, where lower is better
+HIGHER_IS_BETTER = {"captcha.per_s", "gesture_logic.fps"}
+# Results, not performance, they're shown but never count as a regression
+NOT_GATED = {"gesture_logic.detections_per_stream"}
+
+STAGES = {
+    "captcha": bench_captcha,
+    "raster": bench_raster,
+    "gesture": bench_gesture,
+    "ocr": bench_ocr,   # Last, so peak RSS is mostly the OCR models
+}
@@ -0,0 +1,138 @@
+import json
+import os
+import random
+import numpy as np
+from PIL import Image, ImageOps
+from captcha_generator import loc_dict
+
+# --- Configuration ---
+IMAGE_FOLDER = "mall-images"
+STORE_FILE = "mall-images.npy"      # (N, height, width, 3) uint8, memory-mapped
+INDEX_FILE = "mall-images.json"     # label + MRT station for every row
+BG_SIZE = (400, 150)                # Width, Height - same as create_captcha
+VALID_EXTENSIONS = ('.jpg', '.jpeg')
+
+# Loaded once per process, every round after that is just a slice
+_store = None
+_index = None
+
+
+def image_label(path):
+    """'mall-images/amk hub.jpg' -> 'amk hub' (works with / and \\ separators)"""
+    return os.path.splitext(os.path.basename(path.replace("\\", "/")))[0]
+
+
+def source_files(folder_path=IMAGE_FOLDER):
+    return sorted(f for f in os.listdir(folder_path) if f.lower().endswith(VALID_EXTENSIONS))
+
+
+def file_stamp(path):
+    """(mtime, size in bytes), any change to either means the file changed"""
+    stat = os.stat(path)
+    return [stat.st_mtime, stat.st_size]
+
+
+def build_bg_store(folder_path=IMAGE_FOLDER, store_path=STORE_FILE,
+                   index_path=INDEX_FILE, size=BG_SIZE):
+    """Decode, resize and pack every background into one uint8 array on disk"""
+    files = source_files(folder_path)
+
+    if not files:
+        raise FileNotFoundError("No images found in the specified folder.")
+
+    width, height = size
+    # Build next to the live files and swap them in at the end. Writing in
+    # place would truncate a store other processes have memory-mapped, and an
+    # interrupted build would leave a half-written store beside an index that
+    # still looks valid. The store is swapped first and the index last
+    store_tmp, index_tmp = f"{store_path}.tmp", f"{index_path}.tmp"
+    try:
+        store = np.lib.format.open_memmap(store_tmp, mode='w+', dtype=np.uint8,
+                                          shape=(len(files), height, width, 3))
+        index = []
+
+        for i, name in enumerate(files):
+            label = image_label(name)
+            if label not in loc_dict:
+                raise KeyError(f"No MRT station for '{name}', add it to loc_dict")
+
+            with Image.open(os.path.join(folder_path, name)) as bg_image:
+                # Crop to the captcha aspect ratio instead of squashing the photo
+                bg_image = ImageOps.fit(bg_image.convert('RGB'), size, Image.Resampling.LANCZOS)
+                store[i] = np.asarray(bg_image)
+
+            index.append({"file": name, "label": label, "station": loc_dict[label],
+                          "stamp": file_stamp(os.path.join(folder_path, name))})
+
+        store.flush()
+        del store
+
+        with open(index_tmp, 'w') as f:
+            json.dump({"size": [width, height], "images": index}, f, indent=2)
+
+        os.replace(store_tmp, store_path)
+        os.replace(index_tmp, index_path)
+    finally:
+        for path in (store_tmp, index_tmp):
+            if os.path.exists(path):
+                os.remove(path)
+
+    print(f"Packed {len(files)} backgrounds into {store_path} ({width}x{height})")
+    return index
+
+
+def store_is_stale(folder_path=IMAGE_FOLDER, store_path=STORE_FILE, index_path=INDEX_FILE,
+                   size=BG_SIZE):
+    """True if the packed store is missing or doesn't match the folder and BG_SIZE
+
+    Compares the exact file list and each file's mtime and byte size, so added,
+    deleted, renamed and replaced images (even with an older mtime) all count.
+    """
+    if not (os.path.exists(store_path) and os.path.exists(index_path)):
+        return True
+    try:
+        with open(index_path) as f:
+            built = json.load(f)
+    except (OSError, ValueError):
+        return True
+
+    if built.get("size") != list(size):
+        return True
+
+    images = built.get("images", [])
+    if [entry["file"] for entry in images] != source_files(folder_path):
+        return True
+    for entry in images:
+        if entry.get("stamp") != file_stamp(os.path.join(folder_path, entry["file"])):
+            return True
+    return False
+
+
+def load_bg_store(folder_path=IMAGE_FOLDER, store_path=STORE_FILE, index_path=INDEX_FILE):
+    """Memory-map the packed backgrounds, building them first if needed"""
+    global _store, _index
+
+    if _store is None:
+        if store_is_stale(folder_path, store_path, index_path):
+            build_bg_store(folder_path, store_path, index_path)
+
+        _store = np.load(store_path, mmap_mode='r')
+        with open(index_path) as f:
+            _index = json.load(f)["images"]
+
+    return _store, _index
+
+
+def random_bg():
+    """Pick a random background without decoding any JPEG
+
+    Returns a read-only (height, width, 3) view into the memory-mapped store
+    and its index entry. Use Image.fromarray(bg) if a PIL image is needed.
+    """
+    store, index = load_bg_store()
+    i = random.randrange(len(index))
+    return store[i], index[i]
+
+
+if __name__ == "__main__":
+    build_bg_store()
@@ -2,35 +2,53 @@ import cv2
 import numpy as np
 import json
 import os
+import time
+from strokes import make_stroke, save_strokes
 
 # --- Configuration ---
 CANVAS_SIZE = (600, 800) # Height, Width
 PEN_COLOR = (255, 255, 255) # White
 PEN_THICKNESS = 5
 CONFIG_FILE = "canvas_bounds.json"
+STROKE_FILE = "my_drawing.strk"
+FRAME_MS = 16  # waitKey timeout: at most ~60 redraws/s, and the loop sleeps in between
 
 # State variables
 drawing = False
 last_point = None
+dirty = True            # Canvas changed since it was last shown
+strokes = []            # Finished strokes as point arrays (x, y, t)
+current_stroke = []     # Points of the stroke being drawn
+start_time = time.perf_counter()
+
+def timestamp():
+    """Milliseconds since the canvas opened"""
+    return int((time.perf_counter() - start_time) * 1000)
 
 # --- Mouse Callback Function ---
 # This function runs every time the mouse moves or clicks
 def draw_event(event, x, y, flags, param):
-    global drawing, last_point, canvas
+    global drawing, last_point, canvas, dirty, current_stroke
 
     if event == cv2.EVENT_LBUTTONDOWN:
         drawing = True
         last_point = (x, y)
+        current_stroke = [(x, y, timestamp())]
 
     elif event == cv2.EVENT_MOUSEMOVE:
         if drawing and last_point:
             # Draw a line from the last point to the current point
             cv2.line(canvas, last_point, (x, y), PEN_COLOR, PEN_THICKNESS)
             last_point = (x, y)
+            current_stroke.append((x, y, timestamp()))
+            dirty = True
 
     elif event == cv2.EVENT_LBUTTONUP:
         drawing = False
         last_point = None
+        if current_stroke:
+            strokes.append(make_stroke(current_stroke))
+            current_stroke = []
 
 # --- Main Setup ---
 # Create a black image (Height, Width, 3 Channels)
@@ -44,13 +62,18 @@ print("Controls:")
 print("  Draw: Left Mouse Button")
 print("  Clear: 'c'")
 print("  Save: 's'")
+print("  Export strokes: 'e'")
 print("  Quit: 'q'")
 
 # Get window position and save bounds for AHK scripts
 window_shown = False
 
 while True:
-    cv2.imshow("Draw Here", canvas)
+    # Only push the frame to the window when something was drawn, imshow
+    # always uploads the whole 600x800 image
+    if dirty:
+        cv2.imshow("Draw Here", canvas)
+        dirty = False
 
     # After first frame, get window position and save to config
     if not window_shown:
@@ -79,17 +102,26 @@ while True:
         except:
             pass  # Window might not be ready yet
     
-    key = cv2.waitKey(1) & 0xFF
+    # waitKey also runs the mouse callbacks, and blocks (no busy loop) until
+    # a key is pressed or FRAME_MS passes
+    key = cv2.waitKey(FRAME_MS) & 0xFF
     
     if key == ord('q'):
         break
     elif key == ord('c'):
         # Clear by setting all pixels to black (0)
         canvas[:] = 0 
+        strokes.clear()
+        current_stroke = []
+        dirty = True
     elif key == ord('s'):
         # Save the file
         filename = "my_drawing.png"
         cv2.imwrite(filename, canvas)
         print(f"Saved to {filename}!")
+    elif key == ord('e'):
+        # Export the pen strokes with timestamps (see strokes.py for the format)
+        save_strokes(STROKE_FILE, strokes, CANVAS_SIZE[1], CANVAS_SIZE[0])
+        print(f"Exported {len(strokes)} strokes to {STROKE_FILE}!")
 
 cv2.destroyAllWindows()
\ No newline at end of file
@@ -3,74 +3,88 @@ from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import random
 import string
 import os
-
-# loc_dict = {
-#     "amk hub": "ang mo kio",
-#     "clementi" : "clementi",
-#     "imm" : "jurong east",
-#     "junction 8" : "bishan",
-#     "kallang wave" : "stadium",
-#     "mbs" : "bayfront",
-#     "nex" : "serangoon",
-#     "velocity" : "novena",
-#     "vivo" : "harbourfront"
-# }
-
-# def read_bg(folder_path):
-#     valid_extensions = ('.jpg', '.jpeg')
-#     files = [f for f in os.listdir(folder_path) if f.lower().endswith(valid_extensions)]
-
-#     if not files:
-#         raise FileNotFoundError("No images found in the specified folder.")
-
-#     bg_path = os.path.join(folder_path, random.choice(files))
-#     bg_image = Image.open(bg_path).convert('RGB')
-#     location = bg_path.split("\\")[-1].split(".")[0]
-
-#     return bg_image, bg_image.width, bg_image.height, loc_dict[location]
-
-def create_captcha(text):
+import metrics
+
+loc_dict = {
+    "amk hub": "ang mo kio",
+    "clementi" : "clementi",
+    "imm" : "jurong east",
+    "junction 8" : "bishan",
+    "kallang wave" : "stadium",
+    "mbs" : "bayfront",
+    "nex" : "serangoon",
+    "velocity" : "novena",
+    "vivo" : "harbourfront"
+}
+
+def read_bg():
+    # Backgrounds are pre-decoded and packed by bg_store.py, so picking one
+    # is a slice of a memory-mapped array instead of a JPEG decode per round
+    from bg_store import random_bg
+
+    bg, entry = random_bg()
+    height, width = bg.shape[:2]
+
+    return bg, width, height, entry["station"]
+
+VALID_CHARACTERS = "234578bdefhimnqrtyABDEFHILMNQRTY"
+
+VALID_FONTS = ["arialbd.ttf", "ariblk.ttf",
+               "calibri.ttf", "calibrib.ttf",
+               "segoeui.ttf", "segoeuib.ttf",
+               "tahoma.ttf", "tahomabd.ttf",
+               "verdanab.ttf", "verdana.ttf",
+               "times.ttf", "timesbd.ttf",
+               "georgia.ttf", "georgiab.ttf",
+               "cambriab.ttf",
+               "pala.ttf", "palab.ttf",
+               "comic.ttf", "comicbd.ttf",
+               "consolab.ttf",
+               "cour.ttf", "courbd.ttf",
+               "impact.ttf"]
+
+# Built on the first generate_captcha call, see glyph_atlas.py
+_atlas = None
+
+def create_captcha(text, atlas=None, fonts=None):
+    """fonts: font files for the FreeType path (VALID_FONTS by default),
+    an empty list uses Pillow's built-in font"""
+    if fonts is None:
+        fonts = VALID_FONTS
     # Create a blank white image
     width = 400
     height = 150
     img = Image.new('RGB', (width, height), color='white')
     draw = ImageDraw.Draw(img)
     
-    valid_fonts = ["arialbd.ttf", "ariblk.ttf", 
-                   "calibri.ttf", "calibrib.ttf",
-                   "segoeui.ttf", "segoeuib.ttf",
-                   "tahoma.ttf", "tahomabd.ttf",
-                   "verdanab.ttf", "verdana.ttf",
-                   "times.ttf", "timesbd.ttf",
-                   "georgia.ttf", "georgiab.ttf",
-                   "cambriab.ttf",
-                   "pala.ttf", "palab.ttf",
-                   "comic.ttf", "comicbd.ttf",
-                   "consolab.ttf",
-                   "cour.ttf", "courbd.ttf",
-                   "impact.ttf"]
-
     sizes = [random.randint(*sorted([int(0.25*width), int(0.4*height)])) for i in text]
     shapes = ['arc', 'line']
 
     # Calculate proper spacing to avoid overlap
     x_position = 20  # Start with some margin from the left
 
-    for i, char in enumerate(text):
-        font = ImageFont.truetype(random.choice(valid_fonts), sizes[i]) #set font
-        char_color = (random.randint(0, 240), random.randint(0, 240), random.randint(0, 240))
-
-        # Random vertical jitter
-        y_position = random.randint(0, height - sizes[i])
-
-        # Draw the character
-        draw.text((x_position, y_position), char, font=font, fill=char_color)
-
-        # Move x_position to the right, ensuring no overlap
-        # Add the character width plus some spacing
-        char_bbox = draw.textbbox((x_position, y_position), char, font=font)
-        char_width = char_bbox[2] - char_bbox[0]
-        x_position += char_width + random.randint(5, 15)  # Add spacing between characters
+    if atlas is not None:
+        # Composite pre-rendered glyph masks instead of rasterising each one
+        atlas.draw_text(img, text, sizes, x_position)
+    else:
+        for i, char in enumerate(text):
+            if fonts:
+                font = ImageFont.truetype(random.choice(fonts), sizes[i]) #set font
+            else:
+                font = ImageFont.load_default(sizes[i])
+            char_color = (random.randint(0, 240), random.randint(0, 240), random.randint(0, 240))
+
+            # Random vertical jitter
+            y_position = random.randint(0, height - sizes[i])
+
+            # Draw the character
+            draw.text((x_position, y_position), char, font=font, fill=char_color)
+
+            # Move x_position to the right, ensuring no overlap
+            # Add the character width plus some spacing
+            char_bbox = draw.textbbox((x_position, y_position), char, font=font)
+            char_width = char_bbox[2] - char_bbox[0]
+            x_position += char_width + random.randint(5, 15)  # Add spacing between characters
 
     # Add some random "scribble" lines before the text
     for _ in range(random.randint(5,10)):
@@ -94,12 +108,25 @@ def create_captcha(text):
 
     return img  # , location
 
+def get_atlas():
+    global _atlas
+    if _atlas is None:
+        from glyph_atlas import GlyphAtlas
+        _atlas = GlyphAtlas.build(VALID_CHARACTERS, VALID_FONTS)
+    return _atlas
+
 # Usage
 def generate_captcha():
-    valid_characters = "234578bdefhimnqrtyABDEFHILMNQRTY"
-    captcha_text = ''.join(random.choices(valid_characters, k=5))
-
-    image = create_captcha(captcha_text)  # , location
-    image.save("captcha.png")
+    captcha_text = ''.join(random.choices(VALID_CHARACTERS, k=5))
+
+    with metrics.timer("captcha_generate_seconds"):
+        atlas = get_atlas()
+        # Only fonts that actually loaded are used. If none did, the atlas is
+        # empty and FreeType draws with Pillow's built-in font instead
+        image = create_captcha(captcha_text, atlas=atlas if atlas.glyphs else None,
+                               fonts=atlas.fonts)  # , location
+    with metrics.timer("captcha_save_seconds"):
+        image.save("captcha.png")
+    metrics.inc("captchas_generated_total")
 
     return captcha_text, None, image  # location set to None
\ No newline at end of file
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+from PIL import Image, ImageTk
+
+
+def fit_size(width, height, max_width, max_height):
+    """Scale (width, height) down so it fits inside max_width x max_height"""
+    # Same rule the captcha screen always used: only shrink, never enlarge
+    width_ratio = max_width / width if width > max_width else 1
+    height_ratio = max_height / height if height > max_height else 1
+    ratio = min(width_ratio, height_ratio)
+    return (int(width * ratio), int(height * ratio))
+
+
+class DisplayImageCache:
+    """Reuses one PhotoImage per display size instead of making a new one per image
+
+    A new captcha image arrives every round but its size never changes, so the
+    fitted size is cached and the new pixels are pasted into the existing
+    PhotoImage. Labels showing that PhotoImage update in place.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self.sizes = {}                 # (width, height, max_width, max_height) -> fitted size
+        self.photos = OrderedDict()     # fitted size -> PhotoImage
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, pil_image, max_width, max_height):
+        bounds = (pil_image.width, pil_image.height, max_width, max_height)
+        size = self.sizes.get(bounds)
+        if size is None:
+            size = self.sizes[bounds] = fit_size(*bounds)
+
+        if size != (pil_image.width, pil_image.height):
+            scaled = pil_image.resize(size, Image.Resampling.LANCZOS)
+        else:
+            scaled = pil_image
+
+        photo = self.photos.get(size)
+        if photo is not None:
+            self.photos.move_to_end(size)
+            self.hits += 1
+            photo.paste(scaled)
+            return photo
+
+        self.misses += 1
+        photo = ImageTk.PhotoImage(scaled)
+        self.photos[size] = photo
+        while len(self.photos) > self.max_entries:
+            self.photos.popitem(last=False)
+        return photo
+
+    def clear(self):
+        self.sizes.clear()
+        self.photos.clear()
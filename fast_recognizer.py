@@ -0,0 +1,271 @@
+import random
+import time
+import numpy as np
+import cv2
+from PIL import Image
+
+# --- Configuration ---
+MODEL_FILE = "fast_recognizer.npz"
+FEATURE_SIZE = 20           # Every character crop becomes a 20x20 patch
+HIDDEN_UNITS = 128
+MIN_COMPONENT_AREA = 20     # Ignore specks smaller than this many pixels
+MERGE_OVERLAP = 0.3         # Merge blobs that overlap this much horizontally (i dots)
+EVAL_THRESHOLDS = (0.5, 0.7, 0.8, 0.9, 0.95)
+
+
+def skeletonize(binary):
+    """Morphological skeleton, turns filled font glyphs into pen-like centre lines"""
+    kernel = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+    skeleton = np.zeros_like(binary)
+    while cv2.countNonZero(binary):
+        eroded = cv2.erode(binary, kernel)
+        opened = cv2.dilate(eroded, kernel)
+        skeleton = cv2.bitwise_or(skeleton, cv2.subtract(binary, opened))
+        binary = eroded
+    return skeleton
+
+
+def char_features(crop):
+    """Centre a binary character crop in a square and shrink it to a feature vector"""
+    h, w = crop.shape
+    side = max(h, w)
+    square = np.zeros((side, side), dtype=np.uint8)
+    top, left = (side - h) // 2, (side - w) // 2
+    square[top:top + h, left:left + w] = crop
+
+    inner = FEATURE_SIZE - 4  # Leave a 2px border like the training renders
+    small = cv2.resize(square, (inner, inner), interpolation=cv2.INTER_AREA)
+    patch = np.zeros((FEATURE_SIZE, FEATURE_SIZE), dtype=np.float32)
+    patch[2:-2, 2:-2] = small / 255.0
+    return patch.ravel()
+
+
+def segment_characters(gray):
+    """Split the ink on a black canvas into per-character crops, left to right"""
+    _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+    n, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+
+    boxes = [list(stats[i, :4]) for i in range(1, n)
+             if stats[i, cv2.CC_STAT_AREA] >= MIN_COMPONENT_AREA]
+    boxes.sort(key=lambda b: b[0])
+
+    merged = []
+    for x, y, w, h in boxes:
+        if merged:
+            mx, my, mw, mh = merged[-1]
+            overlap = min(mx + mw, x + w) - max(mx, x)
+            if overlap > MERGE_OVERLAP * min(mw, w):
+                nx, ny = min(mx, x), min(my, y)
+                merged[-1] = [nx, ny, max(mx + mw, x + w) - nx, max(my + mh, y + h) - ny]
+                continue
+        merged.append([x, y, w, h])
+
+    return [binary[y:y + h, x:x + w] for x, y, w, h in merged]
+
+
+class FastRecognizer:
+    """Tiny MLP over segmented characters, case-folded like StrictValidator's matching"""
+
+    def __init__(self, classes, w1, b1, w2, b2):
+        self.classes = classes
+        self.w1, self.b1, self.w2, self.b2 = w1, b1, w2, b2
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        data = np.load(path)
+        return cls(str(data["classes"]), data["w1"], data["b1"], data["w2"], data["b2"])
+
+    def save(self, path=MODEL_FILE):
+        np.savez_compressed(path, classes=self.classes,
+                            w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2)
+
+    def predict_proba(self, features):
+        hidden = np.maximum(features @ self.w1 + self.b1, 0)
+        logits = hidden @ self.w2 + self.b2
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def recognize(self, gray, expected_length=None):
+        """Returns (text, confidence), confidence is the weakest character's probability
+
+        Gives (None, 0.0) when the ink doesn't split into expected_length characters,
+        which is the usual sign of joined-up writing the model can't handle.
+        """
+        crops = segment_characters(gray)
+        if not crops or (expected_length is not None and len(crops) != expected_length):
+            return None, 0.0
+
+        probs = self.predict_proba(np.stack([char_features(c) for c in crops]))
+        best = probs.argmax(axis=1)
+        text = ''.join(self.classes[i] for i in best)
+        return text, float(probs[np.arange(len(best)), best].min())
+
+
+def render_training_set(characters, samples_per_glyph=4, seed=0, fonts=None):
+    """Handwriting-ish samples from the captcha glyph atlas: slant, rotate, re-stroke"""
+    from captcha_generator import VALID_FONTS
+    from glyph_atlas import GlyphAtlas
+
+    rng = random.Random(seed)
+    atlas = GlyphAtlas.build(characters, fonts or VALID_FONTS)
+    if not atlas.glyphs:
+        raise RuntimeError("None of the captcha fonts are installed, can't render training data")
+
+    features, labels = [], []
+    for (_, _, char), glyph in atlas.glyphs.items():
+        for _ in range(samples_per_glyph):
+            mask = glyph.mask
+            w, h = mask.size
+            shear = rng.uniform(-0.35, 0.35)
+            mask = mask.transform((w + int(abs(shear) * h), h), Image.Transform.AFFINE,
+                                  (1, shear, -max(shear * h, 0), 0, 1, 0),
+                                  resample=Image.Resampling.BILINEAR)
+            mask = mask.rotate(rng.uniform(-10, 10), resample=Image.Resampling.BILINEAR,
+                               expand=True)
+
+            _, binary = cv2.threshold(np.asarray(mask), 127, 255, cv2.THRESH_BINARY)
+            pen = rng.choice([3, 5, 7])
+            stroke = cv2.dilate(skeletonize(binary), np.ones((pen, pen), np.uint8))
+
+            ys, xs = np.nonzero(stroke)
+            if len(xs) == 0:
+                continue
+            crop = stroke[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+            features.append(char_features(crop))
+            labels.append(char.lower())
+
+    return np.stack(features), labels
+
+
+def train(characters=None, epochs=40, batch_size=128, lr=0.05, seed=0, path=MODEL_FILE,
+          fonts=None):
+    """Train offline on synthetic renders and save the weights to path"""
+    if characters is None:
+        from captcha_generator import VALID_CHARACTERS
+        characters = VALID_CHARACTERS
+
+    start = time.perf_counter()
+    features, labels = render_training_set(characters, seed=seed, fonts=fonts)
+    classes = ''.join(sorted(set(labels)))
+    y = np.array([classes.index(label) for label in labels])
+    print(f"Rendered {len(y)} samples for {len(classes)} classes "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    np_rng = np.random.default_rng(seed)
+    order = np_rng.permutation(len(y))
+    split = int(len(y) * 0.9)
+    train_idx, test_idx = order[:split], order[split:]
+
+    n_features = features.shape[1]
+    w1 = np_rng.normal(0, np.sqrt(2 / n_features), (n_features, HIDDEN_UNITS)).astype(np.float32)
+    b1 = np.zeros(HIDDEN_UNITS, dtype=np.float32)
+    w2 = np_rng.normal(0, np.sqrt(1 / HIDDEN_UNITS), (HIDDEN_UNITS, len(classes))).astype(np.float32)
+    b2 = np.zeros(len(classes), dtype=np.float32)
+    model = FastRecognizer(classes, w1, b1, w2, b2)
+
+    for epoch in range(epochs):
+        np_rng.shuffle(train_idx)
+        for i in range(0, len(train_idx), batch_size):
+            batch = train_idx[i:i + batch_size]
+            x, target = features[batch], y[batch]
+
+            # Forward
+            hidden = np.maximum(x @ model.w1 + model.b1, 0)
+            probs = model.predict_proba(x)
+
+            # Backward (softmax cross-entropy)
+            grad_logits = probs
+            grad_logits[np.arange(len(batch)), target] -= 1
+            grad_logits /= len(batch)
+            grad_hidden = (grad_logits @ model.w2.T) * (hidden > 0)
+
+            model.w2 -= lr * hidden.T @ grad_logits
+            model.b2 -= lr * grad_logits.sum(axis=0)
+            model.w1 -= lr * x.T @ grad_hidden
+            model.b1 -= lr * grad_hidden.sum(axis=0)
+
+    accuracy = (model.predict_proba(features[test_idx]).argmax(axis=1) == y[test_idx]).mean()
+    print(f"Held-out character accuracy: {accuracy:.3f}")
+
+    model.save(path)
+    print(f"Saved model to {path}")
+    return model
+
+
+def evaluate(model, count=200, seed=1, thresholds=EVAL_THRESHOLDS):
+    """Score the model on held-out handwriting from load_generator.py
+
+    The glyph accuracy train() prints is on font renders; this is what the
+    validator actually sees. For each confidence threshold it reports how
+    often the fast path would pass a drawing on its own, and how often it is
+    confident but wrong (those go to EasyOCR).
+    """
+    from load_generator import synthesize
+
+    rng = random.Random(seed)
+    readings = []       # (target, text or None, confidence)
+    for _ in range(count):
+        target, image = synthesize(rng)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        text, confidence = model.recognize(gray, expected_length=len(target))
+        readings.append((target.lower(), text, confidence))
+
+    segmented = [(t, x, c) for t, x, c in readings if x is not None]
+    chars = sum(len(t) for t, _, _ in segmented)
+    correct_chars = sum(a == b for t, x, _ in segmented for a, b in zip(t, x))
+    report = {"drawings": count,
+              "segmented": len(segmented) / count,
+              "char_accuracy": correct_chars / chars if chars else 0.0,
+              "word_accuracy": sum(t == x for t, x, _ in segmented) / count,
+              "thresholds": {}}
+
+    print(f"{count} handwritten drawings: {report['segmented']:.1%} split into the right "
+          f"number of characters")
+    print(f"Character accuracy {report['char_accuracy']:.3f} (on those), "
+          f"word accuracy {report['word_accuracy']:.3f}")
+    print(f"{'threshold':>9} {'decided':>8} {'passed':>8} {'wrong':>8}")
+    for threshold in thresholds:
+        confident = [(t, x) for t, x, c in segmented if c >= threshold]
+        passed = sum(t == x for t, x in confident)
+        row = {"decided": len(confident) / count, "passed": passed / count,
+               "wrong": (len(confident) - passed) / len(confident) if confident else 0.0}
+        report["thresholds"][threshold] = row
+        print(f"{threshold:>9.2f} {row['decided']:>8.1%} {row['passed']:>8.1%} {row['wrong']:>8.1%}")
+    return report
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train or try the fast captcha recognizer")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train_cmd = sub.add_parser("train")
+    train_cmd.add_argument("--epochs", type=int, default=40)
+    train_cmd.add_argument("--output", default=MODEL_FILE)
+    train_cmd.add_argument("--fonts", nargs="+", help="font files to render (default: the captcha fonts)")
+    read_cmd = sub.add_parser("read")
+    read_cmd.add_argument("image")
+    read_cmd.add_argument("--model", default=MODEL_FILE)
+    eval_cmd = sub.add_parser("evaluate", help="accuracy on held-out synthetic handwriting")
+    eval_cmd.add_argument("--model", default=MODEL_FILE)
+    eval_cmd.add_argument("--count", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        train(epochs=args.epochs, path=args.output, fonts=args.fonts)
+        print()
+        evaluate(FastRecognizer.load(args.output))
+    elif args.command == "evaluate":
+        evaluate(FastRecognizer.load(args.model), count=args.count)
+    else:
+        model = FastRecognizer.load(args.model)
+        gray = cv2.imread(args.image, cv2.IMREAD_GRAYSCALE)
+        start = time.perf_counter()
+        text, confidence = model.recognize(gray)
+        print(f"'{text}' confidence {confidence:.2f} "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import random
+import time
+from PIL import Image, ImageDraw, ImageFont
+
+# create_captcha picks sizes in [60, 100], snap them to these
+SIZE_BUCKETS = (60, 70, 80, 90, 100)
+
+
+class Glyph:
+    """Alpha mask of one character plus the metrics draw.text would have used"""
+    __slots__ = ("mask", "offset", "width")
+
+    def __init__(self, mask, offset, width):
+        self.mask = mask        # 'L' image cropped to the ink bbox
+        self.offset = offset    # (left, top) of the bbox relative to the draw origin
+        self.width = width      # bbox width, what create_captcha advances by
+
+
+class GlyphAtlas:
+    def __init__(self, fonts, sizes):
+        self.fonts = fonts
+        self.sizes = sizes
+        self.glyphs = {}    # (font, size, char) -> Glyph
+
+    @classmethod
+    def build(cls, characters, font_names, sizes=SIZE_BUCKETS):
+        """Render every character once for each installed font and size bucket"""
+        fonts = []
+        atlas = cls(fonts, tuple(sizes))
+
+        for font_name in font_names:
+            try:
+                ImageFont.truetype(font_name, sizes[0])
+            except OSError:
+                continue  # Not installed here, same check as font_checker.py
+            fonts.append(font_name)
+
+            for size in sizes:
+                font = ImageFont.truetype(font_name, size)
+                for char in characters:
+                    left, top, right, bottom = font.getbbox(char)
+                    mask = Image.new('L', (max(right - left, 1), max(bottom - top, 1)), 0)
+                    ImageDraw.Draw(mask).text((-left, -top), char, font=font, fill=255)
+                    atlas.glyphs[(font_name, size, char)] = Glyph(mask, (left, top), right - left)
+
+        return atlas
+
+    def bucket(self, size):
+        return min(self.sizes, key=lambda s: abs(s - size))
+
+    def draw_text(self, img, text, sizes, x_position):
+        """Composite text onto img with per-glyph colour and jitter, like create_captcha"""
+        for i, char in enumerate(text):
+            glyph = self.glyphs[(random.choice(self.fonts), self.bucket(sizes[i]), char)]
+            char_color = (random.randint(0, 240), random.randint(0, 240), random.randint(0, 240))
+
+            # Random vertical jitter
+            y_position = random.randint(0, img.height - sizes[i])
+
+            img.paste(char_color, (x_position + glyph.offset[0], y_position + glyph.offset[1]),
+                      glyph.mask)
+
+            x_position += glyph.width + random.randint(5, 15)  # Add spacing between characters
+
+        return x_position
+
+
+def benchmark(rounds=200):
+    """Compare captchas per second of the FreeType and atlas renderers"""
+    from captcha_generator import create_captcha, VALID_CHARACTERS, VALID_FONTS
+
+    start = time.perf_counter()
+    atlas = GlyphAtlas.build(VALID_CHARACTERS, VALID_FONTS)
+    build_time = time.perf_counter() - start
+
+    if not atlas.glyphs:
+        print("None of the captcha fonts are installed, nothing to compare")
+        return None
+
+    texts = [''.join(random.choices(VALID_CHARACTERS, k=5)) for _ in range(rounds)]
+    results = {"fonts": len(atlas.fonts), "glyphs": len(atlas.glyphs),
+               "atlas_build_s": build_time}
+
+    for name, renderer_atlas in (("freetype", None), ("atlas", atlas)):
+        start = time.perf_counter()
+        for text in texts:
+            create_captcha(text, atlas=renderer_atlas, fonts=atlas.fonts)
+        results[f"{name}_per_s"] = rounds / (time.perf_counter() - start)
+
+    print(f"Atlas: {results['glyphs']} glyphs from {results['fonts']} fonts, "
+          f"built in {build_time * 1000:.0f} ms")
+    print(f"FreeType: {results['freetype_per_s']:.1f} captchas/s")
+    print(f"Atlas:    {results['atlas_per_s']:.1f} captchas/s "
+          f"({results['atlas_per_s'] / results['freetype_per_s']:.2f}x)")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
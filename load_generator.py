@@ -0,0 +1,256 @@
+"""Synthetic handwriting to load-test the validator
+
+Turns captcha strings into pen strokes with jitter, slant and stroke-width
+variation, rasterises them exactly like submit_answer, and replays them
+against StrictValidator in-process or a web backend's /validate endpoint
+at a fixed request rate.
+
+    python load_generator.py --requests 200 --rate 5
+    python load_generator.py --url http://localhost:5000/validate --rate 20
+"""
+import base64
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+from captcha_generator import VALID_CHARACTERS
+from rasterize import rasterize_segments
+from strokes import strokes_to_segments
+import metrics
+
+# --- Configuration ---
+CANVAS_WIDTH, CANVAS_HEIGHT = 500, 250   # The Tk drawing canvas in main.py
+CAPTCHA_LENGTH = 5
+SAMPLE_SPACING = 4      # Pixels between mouse motion events along a stroke
+
+
+def arc(cx, cy, rx, ry, start, end, n=12):
+    """Points on an ellipse, angles in degrees with y pointing down (270 is the top)"""
+    return [(cx + rx * math.cos(math.radians(a)), cy + ry * math.sin(math.radians(a)))
+            for a in np.linspace(start, end, n)]
+
+
+# Single-line skeletons in a unit box: x 0..1, y 0 (cap height) .. 1 (baseline),
+# lowercase bodies start at 0.4 and descenders go below 1
+STROKE_FONT = {
+    "2": [arc(0.5, 0.28, 0.3, 0.25, 190, 405) + [(0.1, 1.0), (0.9, 1.0)]],
+    "3": [arc(0.45, 0.26, 0.3, 0.24, 200, 450) + arc(0.45, 0.75, 0.35, 0.25, 270, 520)],
+    "4": [[(0.65, 1.0), (0.65, 0.0), (0.1, 0.7), (0.9, 0.7)]],
+    "5": [[(0.85, 0.0), (0.2, 0.0), (0.15, 0.45)] + arc(0.5, 0.68, 0.35, 0.3, 230, 510)],
+    "7": [[(0.1, 0.0), (0.9, 0.0), (0.35, 1.0)]],
+    "8": [arc(0.5, 0.25, 0.25, 0.25, 0, 360), arc(0.5, 0.72, 0.3, 0.28, 0, 360)],
+    "b": [[(0.2, 0.0), (0.2, 1.0)], arc(0.5, 0.72, 0.3, 0.28, 180, 540)],
+    "d": [[(0.8, 0.0), (0.8, 1.0)], arc(0.5, 0.72, 0.3, 0.28, 0, 360)],
+    "e": [[(0.2, 0.7), (0.8, 0.7)] + arc(0.5, 0.7, 0.3, 0.3, 360, 45)],
+    "f": [[(0.75, 0.05), (0.55, 0.0), (0.42, 0.1), (0.4, 1.0)], [(0.2, 0.45), (0.7, 0.45)]],
+    "h": [[(0.2, 0.0), (0.2, 1.0)], arc(0.5, 0.65, 0.3, 0.22, 180, 360) + [(0.8, 1.0)]],
+    "i": [[(0.5, 0.4), (0.5, 1.0)], [(0.5, 0.15), (0.52, 0.18)]],
+    "m": [[(0.1, 1.0), (0.1, 0.4)] + arc(0.3, 0.6, 0.2, 0.18, 180, 360) + [(0.5, 1.0)],
+          arc(0.7, 0.6, 0.2, 0.18, 180, 360) + [(0.9, 1.0)]],
+    "n": [[(0.2, 0.4), (0.2, 1.0)], arc(0.5, 0.62, 0.3, 0.2, 180, 360) + [(0.8, 1.0)]],
+    "q": [arc(0.45, 0.7, 0.3, 0.28, 0, 360), [(0.75, 0.4), (0.75, 1.35), (0.9, 1.25)]],
+    "r": [[(0.25, 0.4), (0.25, 1.0)], arc(0.5, 0.62, 0.25, 0.2, 180, 300)],
+    "t": [[(0.45, 0.05), (0.45, 0.9), (0.55, 1.0), (0.75, 0.95)], [(0.2, 0.4), (0.75, 0.4)]],
+    "y": [[(0.15, 0.4), (0.5, 0.95)], [(0.85, 0.4), (0.35, 1.35), (0.2, 1.3)]],
+    "A": [[(0.1, 1.0), (0.5, 0.0), (0.9, 1.0)], [(0.28, 0.6), (0.72, 0.6)]],
+    "B": [[(0.2, 0.0), (0.2, 1.0)],
+          [(0.2, 0.0)] + arc(0.55, 0.25, 0.28, 0.25, 270, 450) + [(0.2, 0.5)],
+          [(0.2, 0.5)] + arc(0.57, 0.75, 0.32, 0.25, 270, 450) + [(0.2, 1.0)]],
+    "D": [[(0.2, 0.0), (0.2, 1.0)], [(0.2, 0.0)] + arc(0.45, 0.5, 0.4, 0.5, 270, 450) + [(0.2, 1.0)]],
+    "E": [[(0.8, 0.0), (0.2, 0.0), (0.2, 1.0), (0.8, 1.0)], [(0.2, 0.5), (0.65, 0.5)]],
+    "F": [[(0.8, 0.0), (0.2, 0.0), (0.2, 1.0)], [(0.2, 0.5), (0.65, 0.5)]],
+    "H": [[(0.2, 0.0), (0.2, 1.0)], [(0.8, 0.0), (0.8, 1.0)], [(0.2, 0.5), (0.8, 0.5)]],
+    "I": [[(0.5, 0.0), (0.5, 1.0)], [(0.3, 0.0), (0.7, 0.0)], [(0.3, 1.0), (0.7, 1.0)]],
+    "L": [[(0.2, 0.0), (0.2, 1.0), (0.8, 1.0)]],
+    "M": [[(0.1, 1.0), (0.15, 0.0), (0.5, 0.6), (0.85, 0.0), (0.9, 1.0)]],
+    "N": [[(0.2, 1.0), (0.2, 0.0), (0.8, 1.0), (0.8, 0.0)]],
+    "Q": [arc(0.5, 0.5, 0.38, 0.5, 0, 360), [(0.6, 0.75), (0.9, 1.05)]],
+    "R": [[(0.2, 1.0), (0.2, 0.0)] + arc(0.55, 0.25, 0.28, 0.25, 270, 450) + [(0.2, 0.5)],
+          [(0.45, 0.5), (0.85, 1.0)]],
+    "T": [[(0.1, 0.0), (0.9, 0.0)], [(0.5, 0.0), (0.5, 1.0)]],
+    "Y": [[(0.1, 0.0), (0.5, 0.5), (0.9, 0.0)], [(0.5, 0.5), (0.5, 1.0)]],
+}
+
+
+def resample(points, spacing=SAMPLE_SPACING):
+    """Evenly spaced points along a polyline, like mouse motion events"""
+    out = [points[0]]
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
+        steps = max(int(math.hypot(x2 - x1, y2 - y1) / spacing), 1)
+        for s in range(1, steps + 1):
+            out.append((x1 + (x2 - x1) * s / steps, y1 + (y2 - y1) * s / steps))
+    return out
+
+
+def handwrite(text, rng, width=CANVAS_WIDTH, height=CANVAS_HEIGHT):
+    """Pen strokes (lists of (x, y) canvas points) for text, with per-writer variation"""
+    # Per-drawing style
+    cap_height = rng.uniform(0.35, 0.55) * height
+    char_width = cap_height * rng.uniform(0.55, 0.75)
+    slant = rng.gauss(0.15, 0.12)       # Forward lean, as a fraction of height
+    gap = char_width * rng.uniform(0.15, 0.45)
+    wobble = rng.uniform(0.5, 2.0)      # Hand tremor in pixels
+
+    total = len(text) * char_width + (len(text) - 1) * gap
+    x = rng.uniform(10, max(width - total - 10, 11))
+    baseline = rng.uniform(cap_height + 10, height - 0.4 * cap_height - 10)
+
+    strokes = []
+    for char in text:
+        scale = rng.uniform(0.9, 1.1)
+        drift = rng.gauss(0, cap_height * 0.04)
+        for stroke in STROKE_FONT[char]:
+            points = []
+            for u, v in stroke:
+                px = x + u * char_width * scale - slant * (v - 1) * cap_height
+                py = baseline + drift + (v - 1) * cap_height * scale
+                points.append((px, py))
+            points = [(px + rng.gauss(0, wobble), py + rng.gauss(0, wobble))
+                      for px, py in resample(points)]
+            strokes.append(points)
+        x += char_width * scale + gap * rng.uniform(0.7, 1.3)
+
+    return strokes
+
+
+def synthesize(rng, text=None):
+    """(text, BGR drawing) rasterised the same way submit_answer does"""
+    if text is None:
+        text = ''.join(rng.choices(VALID_CHARACTERS, k=CAPTCHA_LENGTH))
+    segments = strokes_to_segments(handwrite(text, rng))
+    image, _ = rasterize_segments(segments, CANVAS_WIDTH, CANVAS_HEIGHT,
+                                  thickness=rng.choice([3, 4, 5, 6, 7]))
+    return text, image
+
+
+class LocalTarget:
+    """Validate in this process with a shared StrictValidator"""
+
+    def __init__(self, **validator_options):
+        from validator import StrictValidator
+        self.validator = StrictValidator(**validator_options)
+        self.lock = threading.Lock()    # EasyOCR readers aren't thread-safe
+
+    def __call__(self, text, image):
+        with self.lock:
+            passed, _ = self.validator.validate(image, text)
+        return passed
+
+
+class HttpTarget:
+    """POST drawings to a web backend the way templates/index.html does
+
+    The page only sends the image; the expected text is added as "target" so a
+    load-test build of the backend can score it. Accuracy is whatever the
+    backend reports as status "success".
+    """
+
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, text, image):
+        import json
+        import urllib.request
+
+        ok, png = cv2.imencode(".png", image)
+        data_url = "data:image/png;base64," + base64.b64encode(png.tobytes()).decode()
+        body = json.dumps({"image": data_url, "target": text}).encode()
+        request = urllib.request.Request(self.url, data=body,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response).get("status") == "success"
+
+
+def run_load(target, requests=100, rate=5.0, concurrency=4, seed=0, save_dir=None):
+    """Open-loop load: send requests at a fixed rate, report throughput, latency and accuracy"""
+    rng = random.Random(seed)
+    samples = [synthesize(rng) for _ in range(requests)]  # Generate up front, off the clock
+
+    if save_dir:
+        os.makedirs(save_dir, exist_ok=True)
+        for i, (text, image) in enumerate(samples):
+            cv2.imwrite(os.path.join(save_dir, f"{i:05d}_{text}.png"), image)
+
+    latencies = []
+    outcomes = {"passed": 0, "failed": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def send(text, image, scheduled):
+        # Measure from when the request was due, not from when a thread got to
+        # it, otherwise the queueing delay in overload never shows up
+        try:
+            passed = target(text, image)
+            key = "passed" if passed else "failed"
+        except Exception as e:
+            print(f"Request failed: {e}")
+            key = "errors"
+        elapsed = time.perf_counter() - scheduled
+        with lock:
+            latencies.append(elapsed)
+            outcomes[key] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, (text, image) in enumerate(samples):
+            # Schedule against the start time so slow responses don't lower the rate
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, text, image, scheduled)
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    answered = outcomes["passed"] + outcomes["failed"]
+    report = {"requests": requests, "target_rate": rate,
+              "throughput_per_s": requests / elapsed,
+              "p50_ms": float(np.percentile(latencies_ms, 50)),
+              "p90_ms": float(np.percentile(latencies_ms, 90)),
+              "p99_ms": float(np.percentile(latencies_ms, 99)),
+              "accuracy": outcomes["passed"] / answered if answered else 0.0,
+              **outcomes}
+
+    print(f"{requests} requests at {rate}/s target: {report['throughput_per_s']:.2f}/s achieved")
+    print(f"Latency p50 {report['p50_ms']:.0f} ms  p90 {report['p90_ms']:.0f} ms  "
+          f"p99 {report['p99_ms']:.0f} ms")
+    print(f"Accuracy {report['accuracy']:.1%} ({outcomes['passed']}/{answered}), "
+          f"{outcomes['errors']} errors")
+    return report
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Replay synthetic handwriting against the validator")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=5.0, help="requests per second")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--url", help="web backend /validate URL, default is in-process")
+    parser.add_argument("--backend", default="easyocr", help="OCR backend for in-process runs")
+    parser.add_argument("--fast-model", help="fast_recognizer.npz for in-process runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-dir", help="also write the generated drawings here")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+    metrics.configure_from_env()
+
+    if args.url:
+        target = HttpTarget(args.url)
+    else:
+        target = LocalTarget(backend=args.backend, fast_model=args.fast_model)
+
+    report = run_load(target, args.requests, args.rate, args.concurrency,
+                      args.seed, args.save_dir)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,24 @@
 import tkinter as tk
 from tkinter import messagebox, Canvas
-from PIL import Image, ImageTk
 import subprocess
 import os
+import time
 from captcha_generator import generate_captcha
 from reco_main import validate_writing
 from video import perform_67
+from display_cache import DisplayImageCache
+from rasterize import rasterize_segments
+from attempt_log import log_attempt
+import metrics
 import cv2
-import numpy as np
+
+def record_timing(screen, seconds):
+    """Default UI timing hook"""
+    metrics.observe(f"{screen}_screen_seconds", seconds)
+    metrics.debug("Time to %s screen: %.1f ms", screen, seconds * 1000)
 
 class CaptchaApp:
-    def __init__(self, root):
+    def __init__(self, root, timing_hook=record_timing, cursor_command=None):
         self.root = root
         self.root.title("CAPTCHA Challenge")
         self.root.geometry("900x750")
@@ -26,6 +34,16 @@ class CaptchaApp:
         self.last_x = 0
         self.last_y = 0
 
+        # Screens are built once and swapped in and out instead of rebuilt
+        self.screens = {}
+        self.current_screen = None
+        self.image_cache = DisplayImageCache()
+
+        # Called as timing_hook(screen_name, seconds) after every screen switch
+        self.timing_hook = timing_hook
+        # Command line for the cursor effect, the bundled executable by default
+        self.cursor_command = cursor_command
+
         self.root.bind("<Control-b>", self.bypass_captcha)
 
         # Initialize the main screen
@@ -33,16 +51,26 @@ class CaptchaApp:
 
     def show_captcha_screen(self):
         """Display the CAPTCHA and instructions"""
-        # Clear window
-        for widget in self.root.winfo_children():
-            widget.destroy()
+        start_time = time.perf_counter()
 
         # Generate CAPTCHA
         self.captcha_text, self.location, captcha_pil = generate_captcha()
 
+        # Resize to fit within reasonable bounds - leave room for button
+        # (max height is restricted to ensure button is visible)
+        self.captcha_photo = self.image_cache.get(captcha_pil, max_width=600, max_height=200)
+
+        if "captcha" not in self.screens:
+            self.screens["captcha"] = self.build_captcha_screen()
+        self.captcha_img_label.configure(image=self.captcha_photo)
+
+        self.switch_screen("captcha")
+        self.report_timing("captcha", start_time)
+
+    def build_captcha_screen(self):
+        """Build the CAPTCHA screen widgets once, they are reused on every round"""
         # Main frame
         main_frame = tk.Frame(self.root, bg="white", padx=30, pady=30)
-        main_frame.pack(expand=True, fill=tk.BOTH, padx=20, pady=20)
 
         # Title
         title = tk.Label(main_frame, text="CAPTCHA Challenge",
@@ -74,24 +102,10 @@ class CaptchaApp:
                                 font=("Arial", 16, "bold"), bg="white", fg="#333")
         captcha_label.pack(pady=10)
 
-        # Convert PIL image to PhotoImage
-        # Resize to fit within reasonable bounds - leave room for button
-        max_width = 600
-        max_height = 200  # Restrict height to ensure button is visible
-
-        # Calculate ratio to fit both width and height constraints
-        width_ratio = max_width / captcha_pil.width if captcha_pil.width > max_width else 1
-        height_ratio = max_height / captcha_pil.height if captcha_pil.height > max_height else 1
-        ratio = min(width_ratio, height_ratio)
-
-        # Always resize to fit constraints
-        new_size = (int(captcha_pil.width * ratio), int(captcha_pil.height * ratio))
-        captcha_pil = captcha_pil.resize(new_size, Image.Resampling.LANCZOS)
-
-        self.captcha_photo = ImageTk.PhotoImage(captcha_pil)
-        img_label = tk.Label(main_frame, image=self.captcha_photo,
-                            bg="white", relief=tk.SOLID, borderwidth=3)
-        img_label.pack(pady=10)
+        # Image is filled in by show_captcha_screen
+        self.captcha_img_label = tk.Label(main_frame, bg="white",
+                                          relief=tk.SOLID, borderwidth=3)
+        self.captcha_img_label.pack(pady=10)
 
         # Start button
         start_btn = tk.Button(main_frame, text="Start Drawing",
@@ -100,6 +114,24 @@ class CaptchaApp:
                              relief=tk.RAISED, cursor="hand2", wraplength=200)
         start_btn.pack(pady=10)
 
+        return main_frame
+
+    def switch_screen(self, name):
+        """Hide the current screen and show a cached one"""
+        if self.current_screen == name:
+            return
+        if self.current_screen is not None:
+            self.screens[self.current_screen].pack_forget()
+        self.screens[name].pack(expand=True, fill=tk.BOTH, padx=20, pady=20)
+        self.current_screen = name
+
+    def report_timing(self, screen, start_time):
+        """Call the timing hook once Tk has laid out and drawn the new screen"""
+        if self.timing_hook is None:
+            return
+        self.root.after_idle(
+            lambda: self.timing_hook(screen, time.perf_counter() - start_time))
+
     def bypass_captcha(self, event=None):
         # 1. Stop the cursor effect immediately
         self.stop_cursor_effect()
@@ -115,13 +147,27 @@ class CaptchaApp:
 
     def open_canvas(self):
         """Open the drawing canvas while keeping CAPTCHA visible"""
-        # Clear window
-        for widget in self.root.winfo_children():
-            widget.destroy()
+        start_time = time.perf_counter()
 
+        if "canvas" not in self.screens:
+            self.screens["canvas"] = self.build_canvas_screen()
+
+        # Reuse the canvas from the last round, just wipe the old strokes
+        self.reference_img_label.configure(image=self.captcha_photo)
+        self.canvas.delete("all")
+        self.drawing = False
+
+        self.switch_screen("canvas")
+        self.report_timing("canvas", start_time)
+
+        # Start cursor effect after a short delay to ensure canvas is ready
+        metrics.debug("Canvas created, starting cursor effect in 500ms...")
+        self.root.after(500, self.start_cursor_effect)
+
+    def build_canvas_screen(self):
+        """Build the drawing screen widgets once, they are reused on every round"""
         # Main frame
         main_frame = tk.Frame(self.root, bg="white", padx=20, pady=20)
-        main_frame.pack(expand=True, fill=tk.BOTH, padx=20, pady=20)
 
         # Top section - CAPTCHA display
         captcha_section = tk.Frame(main_frame, bg="white")
@@ -131,10 +177,10 @@ class CaptchaApp:
                                 font=("Arial", 14, "bold"), bg="white", fg="#764ba2")
         captcha_title.pack()
 
-        # Display smaller version of CAPTCHA
-        captcha_img_label = tk.Label(captcha_section, image=self.captcha_photo,
-                                    bg="white", relief=tk.SOLID, borderwidth=2)
-        captcha_img_label.pack(pady=5)
+        # Display smaller version of CAPTCHA (image is filled in by open_canvas)
+        self.reference_img_label = tk.Label(captcha_section, bg="white",
+                                            relief=tk.SOLID, borderwidth=2)
+        self.reference_img_label.pack(pady=5)
 
         # Drawing section
         title = tk.Label(main_frame, text="Draw the CAPTCHA text here:",
@@ -168,9 +214,7 @@ class CaptchaApp:
                             relief=tk.RAISED, cursor="hand2")
         submit_btn.pack(side=tk.LEFT, padx=10)
 
-        # Start cursor effect after a short delay to ensure canvas is ready
-        print("\n!!! Canvas created, starting cursor effect in 500ms...")
-        self.root.after(500, self.start_cursor_effect)
+        return main_frame
 
     # LOCATION GUESSING CHALLENGE - COMMENTED OUT
     # def open_location_canvas(self):
@@ -332,6 +376,10 @@ class CaptchaApp:
         # Get the directory where this script is located
         script_dir = os.path.dirname(os.path.abspath(__file__))
         cursor_exe_path = os.path.join(script_dir, 'cursor', 'teleporting_cursor.exe')
+        command = self.cursor_command or [cursor_exe_path]
+
+        # Never leave the previous round's process running
+        self.stop_cursor_effect()
 
         # First, kill any existing teleporting_cursor processes to avoid conflicts
         try:
@@ -339,26 +387,21 @@ class CaptchaApp:
                          capture_output=True, timeout=2)
             subprocess.run(['taskkill', '/F', '/IM', 'jittery_cursor.exe'],
                          capture_output=True, timeout=2)
-            print("Killed existing cursor effect processes")
+            metrics.debug("Killed existing cursor effect processes")
         except:
             pass
 
-        print(f"\n=== STARTING CURSOR EFFECT ===")
-        print(f"Script directory: {script_dir}")
-        print(f"Executable path: {cursor_exe_path}")
-        print(f"File exists: {os.path.exists(cursor_exe_path)}")
+        metrics.debug("Starting cursor effect: %s", command[0])
 
-        if os.path.exists(cursor_exe_path):
+        if os.path.exists(command[0]):
             try:
                 # Run the executable directly (no AutoHotkey needed!)
-                print(f"Launching: {cursor_exe_path}")
-                self.cursor_process = subprocess.Popen([cursor_exe_path],
-                                                      stdout=subprocess.PIPE,
-                                                      stderr=subprocess.PIPE)
-                print(f"✓ Teleporting cursor started successfully!")
-                print(f"✓ Process ID: {self.cursor_process.pid}")
-                print(f"✓ Your cursor should teleport every 1-2 seconds")
-                print("=================================\n")
+                # Its output is never read, pipes would only pile up open fds
+                self.cursor_process = subprocess.Popen(command,
+                                                      stdout=subprocess.DEVNULL,
+                                                      stderr=subprocess.DEVNULL)
+                metrics.inc("cursor_launches_total")
+                metrics.debug("Teleporting cursor started, pid %d", self.cursor_process.pid)
 
             except Exception as e:
                 print(f"ERROR: Failed to start teleporting cursor: {e}")
@@ -366,7 +409,7 @@ class CaptchaApp:
                 traceback.print_exc()
         else:
             print("ERROR: Teleporting cursor executable not found!")
-            print(f"Looking for: {cursor_exe_path}")
+            print(f"Looking for: {command[0]}")
             print("\nPlease verify the file exists at this location.")
 
     def stop_cursor_effect(self):
@@ -374,8 +417,14 @@ class CaptchaApp:
         if self.cursor_process:
             try:
                 self.cursor_process.terminate()
+                # Reap it, otherwise every round leaves a zombie behind
+                try:
+                    self.cursor_process.wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    self.cursor_process.kill()
+                    self.cursor_process.wait()
                 self.cursor_process = None
-                print("Jittery cursor effect stopped")
+                metrics.debug("Jittery cursor effect stopped")
             except Exception as e:
                 print(f"Failed to stop cursor effect: {e}")
 
@@ -410,30 +459,26 @@ class CaptchaApp:
 
         # Save canvas as image
         try:
-            print(f"Validating against captcha text: {self.captcha_text}")
+            metrics.debug("Validating against captcha text: %s", self.captcha_text)
 
             # Get canvas dimensions
             width = self.canvas.winfo_width()
             height = self.canvas.winfo_height()
 
-            # Create a blank image matching canvas size
-            canvas_image = np.zeros((height, width, 3), dtype=np.uint8)
-
             # Get all canvas items and draw them on the numpy array
-            item_count = 0
-            for item in self.canvas.find_all():
-                coords = self.canvas.coords(item)
-                if len(coords) >= 4:
-                    # Draw line
-                    x1, y1, x2, y2 = int(coords[0]), int(coords[1]), int(coords[2]), int(coords[3])
-                    cv2.line(canvas_image, (x1, y1), (x2, y2), (255, 255, 255), 5)
-                    item_count += 1
+            stage_start = time.perf_counter()
+            with metrics.timer("submit_rasterize_seconds"):
+                segments = [self.canvas.coords(item) for item in self.canvas.find_all()]
+                canvas_image, item_count = rasterize_segments(segments, width, height)
+            latencies = {"rasterize_ms": (time.perf_counter() - stage_start) * 1000}
 
-            print(f"Drew {item_count} line segments to image")
+            metrics.observe("submit_segments", item_count, buckets=metrics.COUNT_BUCKETS)
+            metrics.debug("Drew %d line segments to image", item_count)
 
             # Save the image
-            cv2.imwrite('my_drawing.png', canvas_image)
-            print("Saved drawing to my_drawing.png")
+            with metrics.timer("submit_save_seconds"):
+                cv2.imwrite('my_drawing.png', canvas_image)
+            metrics.debug("Saved drawing to my_drawing.png")
 
             # Check if canvas is empty
             if item_count == 0:
@@ -444,14 +489,25 @@ class CaptchaApp:
             messagebox.showinfo("Validating...", "Please wait while we validate your handwriting.\nThis may take a few seconds...")
 
             # Validate the drawing
-            print("Starting validation...")
-            success = validate_writing('my_drawing.png', self.captcha_text)
-            print(f"Validation result: {success}")
+            details = {}
+            stage_start = time.perf_counter()
+            with metrics.timer("submit_validate_seconds"):
+                success = validate_writing('my_drawing.png', self.captcha_text, details=details)
+            latencies["validate_ms"] = (time.perf_counter() - stage_start) * 1000
+            metrics.inc("submit_passed_total" if success else "submit_failed_total")
+
+            attempt = dict(target=self.captcha_text, segments=item_count, passed=success,
+                           latencies=latencies, gesture=None, **details)
 
             if success:
                 messagebox.showinfo("Success!", "CAPTCHA Passed!\n\nStarting final challenge...")
                 # Skip location guessing, go directly to video challenge
+                stage_start = time.perf_counter()
                 result = perform_67()
+                latencies["gesture_ms"] = (time.perf_counter() - stage_start) * 1000
+                attempt["gesture"] = result
+                # Written by a background thread, see attempt_log.py
+                log_attempt(**attempt)
 
                 if result:
                     messagebox.showinfo("🎊 Congratulations! 🎊", "You completed all challenges!\n\nYou are amazing!")
@@ -461,9 +517,10 @@ class CaptchaApp:
                 # Return to start screen
                 self.show_captcha_screen()
             else:
+                log_attempt(**attempt)
                 messagebox.showerror("Failed", "Validation failed. Please try again.\n\nMake sure to write clearly!")
                 # Restart cursor effect after failed validation
-                print("Restarting cursor effect after failed validation...")
+                metrics.debug("Restarting cursor effect after failed validation...")
                 self.start_cursor_effect()
 
         except Exception as e:
@@ -473,6 +530,7 @@ class CaptchaApp:
             traceback.print_exc()
 
 def main():
+    metrics.configure_from_env()
     root = tk.Tk()
     app = CaptchaApp(root)
 
@@ -0,0 +1,193 @@
+"""Timers, counters and histograms for the challenge pipeline
+
+Off by default, every call is then a flag check and nothing else. Entry
+points (main.py and the benchmark CLIs) call configure_from_env(), importing
+this module never starts anything. Turn it on with an environment variable:
+
+    CAPTCHA_METRICS=prom:9100            # Prometheus text on http://localhost:9100/metrics
+    CAPTCHA_METRICS=jsonl:metrics.jsonl  # Append a snapshot every 10s and at exit
+    CAPTCHA_DEBUG=1                      # Bring back the old diagnostic prints
+"""
+import atexit
+import bisect
+import json
+import multiprocessing as mp
+import os
+import threading
+import time
+
+# Seconds, roughly Prometheus' default buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# For things like segments per drawing
+COUNT_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000)
+JSONL_INTERVAL = 10.0
+
+enabled = False
+verbose = os.environ.get("CAPTCHA_DEBUG", "") not in ("", "0")
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last one is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def inc(name, value=1):
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS):
+    if not enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram(buckets)
+        histogram.observe(value)
+
+
+def timer(name):
+    """with metrics.timer("ocr_seconds"): ... records the block's duration"""
+    if not enabled:
+        return _NULL_TIMER
+    return _Timer(name)
+
+
+def debug(message, *args):
+    """Replacement for diagnostic prints, formatting is skipped unless CAPTCHA_DEBUG is set"""
+    if verbose:
+        print(message % args if args else message)
+
+
+def snapshot():
+    with _lock:
+        return {"time": time.time(),
+                "counters": dict(_counters),
+                "histograms": {name: {"count": h.count, "sum": h.total,
+                                      "buckets": dict(zip([*map(str, h.buckets), "+Inf"], h.counts))}
+                               for name, h in _histograms.items()}}
+
+
+def prometheus_text():
+    lines = []
+    with _lock:
+        for name, value in sorted(_counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        for name, h in sorted(_histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip([*map(str, h.buckets), "+Inf"], h.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum {h.total}")
+            lines.append(f"{name}_count {h.count}")
+    return "\n".join(lines) + "\n"
+
+
+def serve(port):
+    """Expose /metrics on a daemon thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # Don't print a line per scrape
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_jsonl(path):
+    with open(path, "a") as f:
+        f.write(json.dumps(snapshot()) + "\n")
+
+
+def start_jsonl(path, interval=JSONL_INTERVAL):
+    def loop():
+        while True:
+            time.sleep(interval)
+            write_jsonl(path)
+
+    threading.Thread(target=loop, daemon=True).start()
+    atexit.register(write_jsonl, path)
+
+
+def configure(spec=None, debug_prints=None):
+    """Set up from a spec like 'prom:9100', 'jsonl:metrics.jsonl' or 'on' (collect only)"""
+    global enabled, verbose
+
+    if debug_prints is not None:
+        verbose = debug_prints
+    if not spec:
+        return
+
+    kind, _, target = spec.partition(":")
+    if kind not in ("prom", "jsonl", "on"):
+        raise ValueError(f"Unknown CAPTCHA_METRICS setting '{spec}'")
+
+    enabled = True
+    if mp.parent_process() is not None:
+        # Worker processes inherit the environment, only the parent may
+        # bind the port or own the JSONL file
+        return
+    if kind == "prom":
+        serve(int(target or 9100))
+    elif kind == "jsonl":
+        start_jsonl(target or "metrics.jsonl")
+
+
+def configure_from_env():
+    """Set up from CAPTCHA_METRICS, call once from a program's entry point"""
+    configure(os.environ.get("CAPTCHA_METRICS"))
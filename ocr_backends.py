@@ -0,0 +1,247 @@
+import glob
+import os
+import time
+import numpy as np
+import cv2
+import easyocr
+import metrics
+
+# --- Configuration ---
+BACKENDS = ("easyocr", "onnx")
+ONNX_DIR = "onnx_models"
+RECOGNIZER_HEIGHT = 64          # EasyOCR resizes every text crop to this height
+# Checked-in captcha drawings, see benchmarks/make_fixtures.py
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "benchmarks", "fixtures", "captchas")
+
+
+class OnnxModule:
+    """Stands in for a torch model inside EasyOCR, but runs an ONNX Runtime session
+
+    EasyOCR only ever calls model.eval() and model(tensor, ...) and reads the
+    returned tensors, so that is all this needs to provide.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, image, *unused):
+        import torch
+        outputs = self.session.run(None, {self.input_name: image.cpu().numpy()})
+        if len(outputs) == 1:
+            return torch.from_numpy(outputs[0])
+        return tuple(torch.from_numpy(out) for out in outputs)
+
+
+def export_recognizer(model, path):
+    import torch
+
+    class ImageOnly(torch.nn.Module):
+        # The CTC recognizer ignores its text argument, keep it out of the graph
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, image):
+            return self.model(image, None)
+
+    dummy = torch.randn(1, 1, RECOGNIZER_HEIGHT, 256)
+    torch.onnx.export(ImageOnly(model).eval(), dummy, path,
+                      input_names=["image"], output_names=["preds"],
+                      dynamic_axes={"image": {0: "batch", 3: "width"},
+                                    "preds": {0: "batch", 1: "steps"}},
+                      opset_version=17)
+
+
+def export_detector(model, path):
+    import torch
+    dummy = torch.randn(1, 3, 320, 640)
+    torch.onnx.export(model.eval(), dummy, path,
+                      input_names=["image"], output_names=["score", "feature"],
+                      dynamic_axes={"image": {0: "batch", 2: "height", 3: "width"},
+                                    "score": {0: "batch", 1: "h", 2: "w"},
+                                    "feature": {0: "batch", 2: "h", 3: "w"}},
+                      opset_version=17)
+
+
+def quantize_model(src_path, dst_path):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(src_path, dst_path, weight_type=QuantType.QInt8)
+
+
+def load_session(reader_model, name, export_fn, quantize, model_dir, session_options=None):
+    """Export a torch model once, optionally int8-quantise it, and open it with ORT"""
+    import onnxruntime as ort
+
+    os.makedirs(model_dir, exist_ok=True)
+    fp32_path = os.path.join(model_dir, f"{name}.onnx")
+    path = os.path.join(model_dir, f"{name}.int8.onnx") if quantize else fp32_path
+
+    if not os.path.exists(fp32_path):
+        print(f"Exporting {name} to {fp32_path}...")
+        export_fn(reader_model, fp32_path)
+    if quantize and not os.path.exists(path):
+        print(f"Quantising {name} to {path}...")
+        quantize_model(fp32_path, path)
+
+    return ort.InferenceSession(path, sess_options=session_options,
+                                providers=["CPUExecutionProvider"])
+
+
+def create_reader(backend="easyocr", quantize=False, onnx_detector=False,
+                  model_dir=ONNX_DIR, intra_op_threads=None, inter_op_threads=None,
+                  strict=False):
+    """Build an easyocr.Reader whose models run on the chosen backend
+
+    reader.backend says what it really runs on ("easyocr", "onnx" or
+    "onnx-int8"). If the ONNX backend can't be set up this falls back to
+    EasyOCR, or raises when strict=True. The thread counts only apply to the
+    ONNX Runtime sessions.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == "easyocr":
+        reader = easyocr.Reader(['en'], gpu=False)
+        reader.backend = "easyocr"
+        return reader
+
+    # EasyOCR quantises its CPU models with torch by default, and the
+    # quantised LSTM can't be exported, so load the float weights here
+    reader = easyocr.Reader(['en'], gpu=False, quantize=False)
+
+    try:
+        options = None
+        if intra_op_threads or inter_op_threads:
+            # Inside the fallback too, it needs onnxruntime
+            from ocr_workers import session_options
+            options = session_options(intra_op_threads, inter_op_threads)
+
+        session = load_session(reader.recognizer, "recognizer", export_recognizer,
+                               quantize, model_dir, options)
+        reader.recognizer = OnnxModule(session)
+
+        if onnx_detector:
+            session = load_session(reader.detector, "detector", export_detector,
+                                   quantize, model_dir, options)
+            reader.detector = OnnxModule(session)
+    except Exception as e:
+        if strict:
+            raise
+        # Missing onnxruntime or an export failure shouldn't stop validation
+        print(f"ONNX backend unavailable, falling back to EasyOCR: {e}")
+        reader = easyocr.Reader(['en'], gpu=False)
+        reader.backend = "easyocr"
+        return reader
+
+    reader.backend = "onnx-int8" if quantize else "onnx"
+    return reader
+
+
+def read_all(reader, images, allowlist):
+    return [reader.readtext(gray, detail=1, allowlist=allowlist,
+                            paragraph=False, min_size=10) for gray in images]
+
+
+def bench_image_paths(folder=BENCH_DIR):
+    """Fixture drawings in a fixed order, named <n>_<captcha text>.png"""
+    paths = sorted(glob.glob(os.path.join(folder, "*.png")))
+    if not paths:
+        raise FileNotFoundError(f"No drawings in {folder}, run python -m benchmarks.make_fixtures")
+    return paths
+
+
+def load_bench_images(paths=None):
+    if paths is None:
+        paths = bench_image_paths()
+    images = []
+    for path in paths:
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise FileNotFoundError(f"Could not find image file at {path}")
+        images.append(image)
+    return images
+
+
+def check_parity(reference, candidate, conf_tolerance=0.1):
+    """Compare two sets of readtext results, returns a list of mismatch messages"""
+    problems = []
+    for i, (ref, cand) in enumerate(zip(reference, candidate)):
+        ref_text = [r[1] for r in ref]
+        cand_text = [c[1] for c in cand]
+        if ref_text != cand_text:
+            problems.append(f"image {i}: text {ref_text} != {cand_text}")
+            continue
+        for r, c in zip(ref, cand):
+            if abs(r[2] - c[2]) > conf_tolerance:
+                problems.append(f"image {i}: '{r[1]}' confidence {r[2]:.3f} vs {c[2]:.3f}")
+    return problems
+
+
+def benchmark(reader, images, allowlist, repeats=10):
+    read_all(reader, images, allowlist)  # Warm up
+    latencies = []
+    for _ in range(repeats):
+        for gray in images:
+            start = time.perf_counter()
+            reader.readtext(gray, detail=1, allowlist=allowlist, paragraph=False, min_size=10)
+            latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return {"p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "mean_ms": float(latencies.mean())}
+
+
+def main():
+    import argparse
+    from validator import CAPTCHA_ALLOWLIST
+
+    parser = argparse.ArgumentParser(description="Check and benchmark the OCR backends")
+    parser.add_argument("images", nargs="*", help="captcha drawings (default: the fixtures)")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--onnx-detector", action="store_true")
+    parser.add_argument("--model-dir", default=ONNX_DIR)
+    args = parser.parse_args()
+    metrics.configure_from_env()
+
+    images = load_bench_images(args.images or None)
+    configs = [("easyocr", dict(backend="easyocr")),
+               ("onnx", dict(backend="onnx", onnx_detector=args.onnx_detector)),
+               ("onnx-int8", dict(backend="onnx", quantize=True, onnx_detector=args.onnx_detector))]
+
+    reference = None
+    failed = False
+    for name, kwargs in configs:
+        # strict: comparing EasyOCR with itself under an ONNX label proves nothing
+        try:
+            reader = create_reader(model_dir=args.model_dir, strict=True, **kwargs)
+        except Exception as e:
+            print(f"{name}: could not set up this backend: {e}")
+            failed = True
+            continue
+        results = read_all(reader, images, CAPTCHA_ALLOWLIST)
+
+        if reference is None:
+            reference = results
+        else:
+            problems = check_parity(reference, results)
+            # int8 is allowed to drift a little in confidence, but not in text
+            if name.endswith("int8"):
+                problems = [p for p in problems if "confidence" not in p]
+            for p in problems:
+                print(f"PARITY {name}: {p}")
+            failed = failed or bool(problems)
+
+        stats = benchmark(reader, images, CAPTCHA_ALLOWLIST, args.repeats)
+        print(f"{name:10s} p50 {stats['p50_ms']:7.1f} ms  p99 {stats['p99_ms']:7.1f} ms  "
+              f"mean {stats['mean_ms']:7.1f} ms")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,167 @@
+import os
+import time
+import multiprocessing as mp
+import threading
+import numpy as np
+import metrics
+
+# --- Configuration ---
+BENCH_TARGET = "bench"      # Only latency matters here, not the verdict
+READY_TIMEOUT = 300.0       # Seconds for every worker to load its models
+
+# Set in each worker process by init_worker
+_validator = None
+_images = None
+
+
+def configure_threads(intra_op=None, inter_op=None):
+    """Set the PyTorch thread pools for this process, None keeps the default"""
+    import torch
+
+    if intra_op is not None:
+        torch.set_num_threads(intra_op)
+    if inter_op is not None:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            # Torch only allows this before any parallel work has started
+            print(f"Could not set inter-op threads: {e}")
+
+
+def session_options(intra_op=None, inter_op=None):
+    """Matching thread settings for ONNX Runtime sessions"""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    if intra_op is not None:
+        options.intra_op_num_threads = intra_op
+    if inter_op is not None:
+        options.inter_op_num_threads = inter_op
+    return options
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def cpu_slice(worker_index, threads_per_worker, cpus=None):
+    """Disjoint block of CPUs for one worker, wrapping if there aren't enough"""
+    cpus = cpus or available_cpus()
+    start = worker_index * threads_per_worker
+    return [cpus[(start + i) % len(cpus)] for i in range(threads_per_worker)]
+
+
+def pin_to_cpus(cpus):
+    """Pin the current process to the given CPU ids, returns False if unsupported"""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+        return True
+    try:
+        import psutil  # Windows has no sched_setaffinity
+        psutil.Process().cpu_affinity(list(cpus))
+        return True
+    except (ImportError, AttributeError):
+        print("CPU pinning is not supported on this platform, skipping")
+        return False
+
+
+def init_worker(worker_ids, intra_op, inter_op, pin, backend, ready=None):
+    """Pool initializer: claim a worker index, pin, set threads, warm a validator"""
+    global _validator, _images
+
+    try:
+        from validator import StrictValidator
+        from ocr_backends import load_bench_images
+
+        with worker_ids.get_lock():
+            worker_index = worker_ids.value
+            worker_ids.value += 1
+
+        if pin:
+            pin_to_cpus(cpu_slice(worker_index, intra_op or 1))
+
+        _validator = StrictValidator(backend=backend, intra_op_threads=intra_op,
+                                     inter_op_threads=inter_op)
+        _images = load_bench_images()  # Fixture drawings, raises if one is missing
+        _validator.validate(_images[0], BENCH_TARGET)  # Warm up
+    except BaseException:
+        # Pool would replace this worker forever while the parent waits at the
+        # barrier; breaking it makes the parent fail straight away instead
+        if ready is not None:
+            ready.abort()
+        raise
+
+    if ready is not None:
+        ready.wait(READY_TIMEOUT)
+
+
+def run_one(i):
+    image = _images[i % len(_images)]
+    start = time.perf_counter()
+    _validator.validate(image, BENCH_TARGET)
+    return time.perf_counter() - start
+
+
+def run_config(workers, intra_op, inter_op=1, pin=False, backend="easyocr", requests=50):
+    """Throughput and latency percentiles for one (workers, threads) setting"""
+    ctx = mp.get_context("spawn")
+    worker_ids = ctx.Value("i", 0)
+    ready = ctx.Barrier(workers + 1)
+
+    with ctx.Pool(workers, initializer=init_worker,
+                  initargs=(worker_ids, intra_op, inter_op, pin, backend, ready)) as pool:
+        try:
+            ready.wait(READY_TIMEOUT)  # Don't time model loading
+        except threading.BrokenBarrierError:
+            raise RuntimeError(f"OCR workers failed to start or took over {READY_TIMEOUT:.0f}s, "
+                               "see the worker traceback above") from None
+        start = time.perf_counter()
+        latencies = list(pool.imap_unordered(run_one, range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return {"workers": workers, "intra_op": intra_op, "inter_op": inter_op, "pin": pin,
+            "throughput_per_s": requests / elapsed,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99))}
+
+
+def sweep(worker_counts, thread_counts, inter_op=1, pin=False, backend="easyocr", requests=50):
+    results = []
+    print(f"{'workers':>7} {'threads':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for workers in worker_counts:
+        for threads in thread_counts:
+            result = run_config(workers, threads, inter_op, pin, backend, requests)
+            results.append(result)
+            print(f"{workers:>7} {threads:>7} {result['throughput_per_s']:>8.2f} "
+                  f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+    return results
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Sweep OCR worker and thread settings")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4],
+                        help="torch intra-op threads per worker")
+    parser.add_argument("--inter-op", type=int, default=1)
+    parser.add_argument("--pin", action="store_true", help="pin each worker to its own CPUs")
+    parser.add_argument("--backend", default="easyocr")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    metrics.configure_from_env()
+
+    results = sweep(args.workers, args.threads, args.inter_op, args.pin,
+                    args.backend, args.requests)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
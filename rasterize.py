@@ -0,0 +1,25 @@
+import numpy as np
+import cv2
+
+PEN_COLOR = (255, 255, 255)  # White
+PEN_THICKNESS = 5
+
+
+def rasterize_segments(segments, width, height, thickness=PEN_THICKNESS):
+    """Draw Tk canvas line coords onto a black image, the way submit_answer saves drawings
+
+    segments is a list of coordinate lists as returned by Canvas.coords(item).
+    Returns the (height, width, 3) image and the number of segments drawn.
+    """
+    # Create a blank image matching canvas size
+    canvas_image = np.zeros((height, width, 3), dtype=np.uint8)
+
+    item_count = 0
+    for coords in segments:
+        if len(coords) >= 4:
+            # Draw line
+            x1, y1, x2, y2 = int(coords[0]), int(coords[1]), int(coords[2]), int(coords[3])
+            cv2.line(canvas_image, (x1, y1), (x2, y2), PEN_COLOR, thickness)
+            item_count += 1
+
+    return canvas_image, item_count
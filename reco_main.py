@@ -1,13 +1,30 @@
+import os
 import cv2
 from validator import StrictValidator  # Assuming you saved the class in validator.py
+from fast_recognizer import MODEL_FILE
+import metrics
 
+_validator = None
+_validator_model = None
 
-def validate_writing(img_path, captcha_text, allow_spaces=False):
-    # 1. Initialize the validator
-    # (This takes a few seconds to load the AI model)
-    print("Initializing EasyOCR validator...")
-    my_validator = StrictValidator()
-    print("Validator loaded successfully")
+
+def get_validator():
+    """Shared validator, loaded on first use and kept for every later round"""
+    global _validator, _validator_model
+    # Use the small captcha recognizer if it has been trained
+    # (python fast_recognizer.py train), EasyOCR is then only a fallback
+    fast_model = MODEL_FILE if os.path.exists(MODEL_FILE) else None
+    if _validator is None or _validator_model != fast_model:
+        # (This takes a few seconds to load the AI model)
+        with metrics.timer("validator_load_seconds"):
+            _validator = StrictValidator(fast_model=fast_model)
+        _validator_model = fast_model
+    return _validator
+
+
+def validate_writing(img_path, captcha_text, allow_spaces=False, details=None):
+    # 1. Get the validator, a new one per round kept another reader in memory
+    my_validator = get_validator()
 
     # 2. Load an image from your computer
     # cv2.imread loads the image as a NumPy array automatically
@@ -19,13 +36,19 @@ def validate_writing(img_path, captcha_text, allow_spaces=False):
         print(f"Error: Could not find image file at {image_path}")
         return False
 
-    print(f"Image loaded: {image_np.shape}")
+    metrics.debug("Image loaded: %s", image_np.shape)
 
     # 3. Put the image into the validator
     # Target text is what you EXPECTED them to write
-    success, message = my_validator.validate(image_np, target_text=captcha_text, allow_spaces=allow_spaces)
+    with metrics.timer("validate_seconds"):
+        success, message = my_validator.validate(image_np, target_text=captcha_text, allow_spaces=allow_spaces)
+
+    # Pass a dict as details to get what the OCR saw (used for the attempt log)
+    if details is not None:
+        details.update(message=message, engine=my_validator.last_engine,
+                       candidates=my_validator.last_candidates)
 
-    print(f"Result: {success}")
-    print(f"Message: {message}")
+    metrics.debug("Result: %s", success)
+    metrics.debug("Message: %s", message)
 
     return success
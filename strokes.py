@@ -0,0 +1,70 @@
+"""Timestamped pen strokes and a compact binary format for them
+
+A stroke is a structured numpy array of points with fields x, y (int16
+pixels) and t (uint32 milliseconds since the drawing started). A .strk file
+holds a whole drawing:
+
+    b"STRK", version u8, width u16, height u16, stroke count u32,
+    then per stroke: point count u32 followed by the points (8 bytes each)
+
+All values little-endian. Written by canvas.py, read by the validator
+helpers below and by the benchmarks.
+"""
+import struct
+import numpy as np
+from rasterize import rasterize_segments, PEN_THICKNESS
+
+MAGIC = b"STRK"
+VERSION = 1
+POINT_DTYPE = np.dtype([("x", "<i2"), ("y", "<i2"), ("t", "<u4")])
+_HEADER = struct.Struct("<4sBHHI")
+_COUNT = struct.Struct("<I")
+
+
+def make_stroke(points):
+    """[(x, y, t_ms), ...] -> stroke array"""
+    return np.array([tuple(p) for p in points], dtype=POINT_DTYPE)
+
+
+def save_strokes(path, strokes, width, height):
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, width, height, len(strokes)))
+        for stroke in strokes:
+            stroke = np.asarray(stroke, dtype=POINT_DTYPE)
+            f.write(_COUNT.pack(len(stroke)))
+            f.write(stroke.tobytes())
+
+
+def load_strokes(path):
+    """Returns (strokes, width, height)"""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    magic, version, width, height, count = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} stroke file")
+
+    offset = _HEADER.size
+    strokes = []
+    for _ in range(count):
+        (n,) = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        strokes.append(np.frombuffer(data, dtype=POINT_DTYPE, count=n, offset=offset))
+        offset += n * POINT_DTYPE.itemsize
+    return strokes, width, height
+
+
+def strokes_to_segments(strokes):
+    """One [x1, y1, x2, y2] line per pair of consecutive points, like Tk canvas items"""
+    segments = []
+    for stroke in strokes:
+        if isinstance(stroke, np.ndarray) and stroke.dtype == POINT_DTYPE:
+            stroke = list(zip(stroke["x"].tolist(), stroke["y"].tolist()))
+        segments.extend([x1, y1, x2, y2] for (x1, y1), (x2, y2) in zip(stroke, stroke[1:]))
+    return segments
+
+
+def rasterize_strokes(strokes, width, height, thickness=PEN_THICKNESS):
+    """Stroke file contents -> the image StrictValidator.validate expects"""
+    image, _ = rasterize_segments(strokes_to_segments(strokes), width, height, thickness)
+    return image
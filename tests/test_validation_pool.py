@@ -0,0 +1,80 @@
+"""ValidationPool recovery, with a stub validator instead of EasyOCR
+
+    python -m pytest tests
+"""
+import os
+import signal
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from validation_pool import ValidationPool  # noqa: E402
+
+RESULT_TIMEOUT = 30
+
+pytestmark = pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs SIGKILL")
+
+
+class StubValidator:
+    """Passes when the drawing has ink; targets starting with "slow" take a second"""
+
+    def __init__(self, intra_op_threads=None, **options):
+        pass
+
+    def validate(self, image, target, allow_spaces=False):
+        if target.startswith("slow"):
+            time.sleep(1)
+        return bool(image.any()), f"{target}:{int(image.sum())}"
+
+
+def drawing(value=1):
+    return np.full((20, 30), value, dtype=np.uint8)
+
+
+@pytest.fixture
+def pool():
+    pool = ValidationPool(workers=2, max_height=50, max_width=50,
+                          validator_class=StubValidator, job_timeout=10)
+    assert pool.wait_ready(timeout=RESULT_TIMEOUT)
+    yield pool
+    pool.close()
+
+
+def kill(pid):
+    os.kill(pid, signal.SIGKILL)
+
+
+def wait_for(condition, timeout=RESULT_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_round_trip(pool):
+    assert pool.submit(drawing(), "abc").result(RESULT_TIMEOUT) == (True, "abc:600")
+    assert pool.submit(drawing(0), "abc").result(RESULT_TIMEOUT) == (False, "abc:0")
+
+
+def test_killed_idle_workers_are_replaced(pool):
+    old_pids = [worker.pid for worker in pool.workers]
+    for pid in old_pids:
+        kill(pid)
+
+    wait_for(lambda: all(w.pid not in old_pids and w.ready for w in pool.workers))
+    for i in range(6):
+        assert pool.submit(drawing(), f"job{i}").result(RESULT_TIMEOUT)[0]
+    assert all(h["restarts"] == 1 for h in pool.health())
+
+
+def test_job_survives_its_worker_being_killed(pool):
+    future = pool.submit(drawing(), "slow")
+    busy = [w for w in pool.workers if w.job is not None]
+    assert len(busy) == 1
+    kill(busy[0].pid)
+
+    assert future.result(RESULT_TIMEOUT) == (True, "slow:600")
+    assert sum(h["restarts"] for h in pool.health()) == 1
@@ -0,0 +1,421 @@
+"""Multi-process validation with rasters passed through shared memory
+
+Each worker process keeps its own warm StrictValidator. Drawings are copied
+once into a multiprocessing.shared_memory slab and only (job id, slot index,
+shape, target) crosses the process boundary.
+
+Every worker has its own pipe and the parent only hands a job to an idle
+worker, so it always knows who holds what. There is no shared task queue
+whose lock a killed worker could take with it. Crashed or stuck workers are
+restarted on a fresh pipe and their job is retried.
+
+    pool = ValidationPool(workers=4)
+    future = pool.submit(drawing, "ab3de")
+    passed, message = future.result()
+    pool.close()
+
+    python validation_pool.py --max-workers 4   # scaling benchmark, 1..4 workers
+"""
+import collections
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+import numpy as np
+import cv2
+import metrics
+
+# --- Configuration ---
+MAX_HEIGHT, MAX_WIDTH = 600, 800    # Largest raster a slot holds (canvas.py's canvas)
+JOB_TIMEOUT = 60.0                  # Seconds before a busy worker counts as stuck
+MAX_RETRIES = 1
+HEALTH_INTERVAL = 0.5
+MAX_STARTUP_FAILURES = 5            # Crashes before ever getting ready, then we stop respawning
+MAX_BACKOFF = 30.0                  # Longest wait between respawns of a failing worker
+
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+
+def worker_main(worker_id, shm_name, slot_size, conn, validator_options, intra_op, pin,
+                validator_class=None):
+    """Runs in the child: attach to the slab, warm a validator, serve jobs from conn"""
+    from ocr_workers import pin_to_cpus, cpu_slice
+
+    if validator_class is None:
+        from validator import StrictValidator as validator_class
+
+    if pin:
+        pin_to_cpus(cpu_slice(worker_id, intra_op or 1))
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    validator = validator_class(intra_op_threads=intra_op, **validator_options)
+    conn.send(("ready",))
+
+    try:
+        while True:
+            try:
+                task = conn.recv()
+            except EOFError:
+                break   # Parent went away
+            if task is None:
+                break
+            job_id, slot, height, width, target, allow_spaces = task
+
+            image = np.ndarray((height, width), dtype=np.uint8,
+                               buffer=shm.buf, offset=slot * slot_size)
+            try:
+                passed, message = validator.validate(image, target, allow_spaces=allow_spaces)
+                conn.send(("done", job_id, passed, message))
+            except Exception as e:
+                conn.send(("error", job_id, repr(e)))
+            del image  # Release the view before the slab can be closed
+    finally:
+        shm.close()
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn            # Parent's end of this worker's own pipe
+        self.pid = process.pid
+        self.ready = False
+        self.job = None             # job_id while busy
+        self.jobs_done = 0
+        self.restarts = 0
+        self.failures = 0           # Startup failures in a row, for the respawn backoff
+        self.respawn_at = None      # Set while waiting to be respawned
+        self.given_up = False
+
+    @property
+    def idle(self):
+        return self.ready and self.job is None and self.respawn_at is None and not self.given_up
+
+
+class _Job:
+    def __init__(self, future, task):
+        self.future = future
+        self.task = task
+        self.retries = 0
+        self.worker_id = None       # Who is running it, None while queued in the parent
+        self.deadline = None        # Set when handed to a worker, the supervisor enforces it
+
+
+class ValidationPool:
+    def __init__(self, workers=2, slots=None, max_height=MAX_HEIGHT, max_width=MAX_WIDTH,
+                 intra_op_threads=1, pin=False, job_timeout=JOB_TIMEOUT, validator_class=None,
+                 **validator_options):
+        self.ctx = mp.get_context("spawn")
+        self.slot_size = max_height * max_width
+        self.slots = slots or workers * 2
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_size)
+        self.slab = np.ndarray((self.slots, self.slot_size), dtype=np.uint8, buffer=self.shm.buf)
+
+        self.free_slots = queue.Queue()
+        for slot in range(self.slots):
+            self.free_slots.put(slot)
+
+        self.job_ids = itertools.count()
+        self.jobs = {}                          # job_id -> _Job
+        self.pending = collections.deque()      # job_ids waiting for an idle worker
+        self.lock = threading.RLock()
+        self.stopping = False
+
+        self.worker_args = (validator_options, intra_op_threads, pin, validator_class)
+        self.job_timeout = job_timeout
+        self.workers = [self._spawn(i) for i in range(workers)]
+
+        self.supervisor = threading.Thread(target=self._supervise, daemon=True)
+        self.supervisor.start()
+
+    def _spawn(self, worker_id):
+        parent_conn, child_conn = self.ctx.Pipe()
+        validator_options, intra_op, pin, validator_class = self.worker_args
+        process = self.ctx.Process(target=worker_main, daemon=True,
+                                   args=(worker_id, self.shm.name, self.slot_size, child_conn,
+                                         validator_options, intra_op, pin, validator_class))
+        process.start()
+        child_conn.close()  # Only the child uses it, so a dead child shows up as EOF here
+        return _Worker(process, parent_conn)
+
+    def submit(self, image, target, allow_spaces=False):
+        """Queue a drawing, returns a Future of (passed, message); blocks while all slots are busy"""
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        height, width = image.shape
+        if height * width > self.slot_size:
+            raise ValueError(f"Raster {width}x{height} is larger than a pool slot")
+
+        slot = self.free_slots.get()
+        self.slab[slot, :height * width] = image.ravel()
+
+        future = Future()
+        job_id = next(self.job_ids)
+        task = (job_id, slot, height, width, target, allow_spaces)
+        with self.lock:
+            self.jobs[job_id] = _Job(future, task)
+            self.pending.append(job_id)
+            self._dispatch()
+        metrics.inc("pool_jobs_submitted_total")
+        return future
+
+    def _dispatch(self):
+        """Hand queued jobs to idle workers, call with the lock held"""
+        for worker_id, worker in enumerate(self.workers):
+            if not self.pending:
+                return
+            if not worker.idle:
+                continue
+            job_id = self.pending.popleft()
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue    # Failed while it was queued
+            try:
+                worker.conn.send(job.task)
+            except (OSError, ValueError):
+                self.pending.appendleft(job_id)
+                continue    # Dead pipe, the supervisor restarts this worker
+            worker.job = job_id
+            job.worker_id = worker_id
+            job.deadline = time.monotonic() + self.job_timeout
+
+    def _finish(self, job_id, result=None, error=None):
+        with self.lock:
+            job = self.jobs.pop(job_id, None)
+        if job is None:
+            return  # Already finished or failed
+        self.free_slots.put(job.task[1])
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+    def _retry(self, job_id, reason):
+        """Queue a job again, its raster is still in the slot; fail it once out of retries"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            retry = job is not None and job.retries < MAX_RETRIES
+            if retry:
+                job.retries += 1
+                job.worker_id = job.deadline = None
+                self.pending.appendleft(job_id)
+        if not retry and job is not None:
+            self._finish(job_id, error=WorkerCrashed(reason))
+
+    def _handle(self, worker_id, message):
+        worker = self.workers[worker_id]
+        kind = message[0]
+        if kind == "ready":
+            worker.ready = True
+            worker.failures = 0
+            return
+        job_id = message[1]
+        if worker.job == job_id:
+            worker.job = None
+            worker.jobs_done += kind == "done"
+        if kind == "done":
+            self._finish(job_id, result=(message[2], message[3]))
+        elif kind == "error":
+            self._finish(job_id, error=RuntimeError(message[2]))
+
+    def _restart(self, worker_id, reason):
+        worker = self.workers[worker_id]
+        metrics.inc("pool_worker_restarts_total")
+
+        if worker.process.is_alive():
+            worker.process.terminate()
+        worker.process.join(timeout=5)
+        # Never reuse the pipe, whatever state the old worker left it in
+        worker.conn.close()
+
+        if worker.job is not None:
+            job_id, worker.job = worker.job, None
+            self._retry(job_id, f"worker {worker_id} {reason}")
+
+        # Dying before ever getting ready usually means it will fail again
+        # (bad model files, out of memory...), so back off instead of
+        # respawning it every health check
+        failures = 0 if worker.ready else worker.failures + 1
+        worker.ready = False
+        if failures > MAX_STARTUP_FAILURES:
+            print(f"Validation worker {worker_id} {reason}, failed to start "
+                  f"{failures} times in a row, not restarting it")
+            worker.given_up = True
+            return
+
+        delay = min(HEALTH_INTERVAL * 2 ** failures, MAX_BACKOFF) if failures else 0.0
+        print(f"Validation worker {worker_id} {reason}, restarting"
+              + (f" in {delay:.1f}s" if delay else ""))
+        worker.failures = failures
+        worker.respawn_at = time.monotonic() + delay
+        if not delay:
+            self._respawn(worker_id)
+
+    def _respawn(self, worker_id):
+        old = self.workers[worker_id]
+        replacement = self._spawn(worker_id)
+        replacement.restarts = old.restarts + 1
+        replacement.failures = old.failures
+        self.workers[worker_id] = replacement
+
+    def _check_health(self):
+        now = time.monotonic()
+        for worker_id, worker in enumerate(self.workers):
+            if self.stopping:
+                return
+            if worker.given_up:
+                continue
+            if worker.respawn_at is not None:
+                if now >= worker.respawn_at:
+                    self._respawn(worker_id)
+            elif not worker.process.is_alive():
+                self._restart(worker_id, f"exited with code {worker.process.exitcode}")
+
+        # Deadlines live on the jobs, the worker holding one is the one to restart
+        with self.lock:
+            overdue = {job.worker_id for job in self.jobs.values()
+                       if job.deadline is not None and job.deadline < now}
+        for worker_id in overdue:
+            if self.workers[worker_id].job is not None:
+                self._restart(worker_id, f"stuck for over {self.job_timeout:.0f}s")
+
+    def _supervise(self):
+        """One thread reads every worker's pipe, dispatches jobs and restarts workers"""
+        next_check = time.monotonic() + HEALTH_INTERVAL
+        while not self.stopping:
+            conns = {w.conn: i for i, w in enumerate(self.workers)
+                     if not w.conn.closed and w.respawn_at is None and not w.given_up}
+            timeout = max(next_check - time.monotonic(), 0)
+            if conns:
+                ready = wait(list(conns), timeout=timeout)
+            else:
+                ready = []
+                time.sleep(timeout)
+
+            with self.lock:
+                for conn in ready:
+                    worker_id = conns[conn]
+                    try:
+                        message = conn.recv()
+                    except (EOFError, OSError):
+                        # Worker died, stop watching the pipe until it is restarted
+                        conn.close()
+                        continue
+                    self._handle(worker_id, message)
+
+                if time.monotonic() >= next_check:
+                    self._check_health()
+                    next_check = time.monotonic() + HEALTH_INTERVAL
+                self._dispatch()
+
+    def health(self):
+        """Per-worker status, for dashboards or a readiness probe"""
+        return [{"worker": i, "pid": w.pid, "alive": w.process.is_alive(), "ready": w.ready,
+                 "busy": w.job is not None, "jobs_done": w.jobs_done, "restarts": w.restarts,
+                 "given_up": w.given_up}
+                for i, w in enumerate(self.workers)]
+
+    def wait_ready(self, timeout=None):
+        """True once every worker is ready (or given up on) and at least one is ready"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not all(w.ready or w.given_up for w in self.workers):
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return any(w.ready for w in self.workers)
+
+    def close(self):
+        self.stopping = True
+        self.supervisor.join()
+        for worker in self.workers:
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self.workers:
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+
+        with self.lock:
+            pending = list(self.jobs)
+        for job_id in pending:
+            self._finish(job_id, error=WorkerCrashed("pool closed"))
+
+        del self.slab
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def scaling_benchmark(max_workers, requests=100, seed=0, **pool_options):
+    """Throughput of 1..max_workers workers on the same synthetic drawings"""
+    import random
+    from load_generator import synthesize
+
+    rng = random.Random(seed)
+    samples = [synthesize(rng) for _ in range(requests)]
+
+    print(f"{'workers':>7} {'req/s':>8} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    results = []
+    for workers in range(1, max_workers + 1):
+        with ValidationPool(workers=workers, **pool_options) as pool:
+            pool.wait_ready()
+            start = time.perf_counter()
+            submitted = []
+            for text, image in samples:
+                submitted.append((time.perf_counter(), pool.submit(image, text)))
+            latencies = []
+            for sent, future in submitted:
+                future.result()
+                latencies.append(time.perf_counter() - sent)
+            elapsed = time.perf_counter() - start
+
+        latencies_ms = np.array(latencies) * 1000
+        result = {"workers": workers, "throughput_per_s": requests / elapsed,
+                  "p50_ms": float(np.percentile(latencies_ms, 50)),
+                  "p99_ms": float(np.percentile(latencies_ms, 99))}
+        result["speedup"] = result["throughput_per_s"] / results[0]["throughput_per_s"] if results else 1.0
+        results.append(result)
+        print(f"{workers:>7} {result['throughput_per_s']:>8.2f} {result['speedup']:>7.2f}x "
+              f"{result['p50_ms']:>8.0f} {result['p99_ms']:>8.0f}")
+    return results
+
+
+def main():
+    import argparse
+    import json
+    import os
+
+    parser = argparse.ArgumentParser(description="Scaling benchmark for the validation pool")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads per worker")
+    parser.add_argument("--pin", action="store_true")
+    parser.add_argument("--backend", default="easyocr")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+    metrics.configure_from_env()
+
+    results = scaling_benchmark(args.max_workers, args.requests,
+                                intra_op_threads=args.threads, pin=args.pin,
+                                backend=args.backend)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,180 @@
 import cv2
 import mediapipe as mp
+import numpy as np
 import time
+import metrics
 
-def perform_67():
-    # --- Configuration ---
-    SWAP_THRESHOLD = 0.05
-    RESET_TIME = 1.0
-    SUCCESS_DISPLAY_DURATION = 3.0  # Seconds to keep showing text after success
+# --- Configuration ---
+SWAP_THRESHOLD = 0.05
+RESET_TIME = 1.0
+SUCCESS_DISPLAY_DURATION = 3.0  # Seconds to keep showing text after success
+REQUIRED_REPS = 2
+ROI_PADDING = 0.5   # Grow the tracked hands' box by this much of its size on each side
+ROI_MARGIN = 0.1    # Move the crop once a hand is this close (fraction of crop) to its edge
 
-    # --- Validation Thresholds ---
-    FLATNESS_TOLERANCE = 1
+# --- Validation Thresholds ---
+FLATNESS_TOLERANCE = 1
+
+# --- Validator Function ---
+def is_valid_hand(landmarks, label):
+    idx_mcp_y = landmarks.landmark[5].y
+    pinky_mcp_y = landmarks.landmark[17].y
+    
+    if abs(idx_mcp_y - pinky_mcp_y) > FLATNESS_TOLERANCE:
+        return False, "Keep Hand Flat!"
+
+    thumb_tip_x = landmarks.landmark[4].x
+    pinky_tip_x = landmarks.landmark[20].x
+    
+    if label == "Left":
+        if thumb_tip_x > pinky_tip_x: 
+            return False, "Rotate Palm Up"
+    else:
+        if thumb_tip_x < pinky_tip_x:
+            return False, "Rotate Palm Up"
+    return True, "OK"
+
+def wrists(hand_landmarks, labels):
+    """(left wrist, right wrist) landmarks, None for a missing side"""
+    left_w, right_w = None, None
+    for hl, lbl in zip(hand_landmarks, labels):
+        if lbl == "Left": left_w = hl.landmark[0]
+        else: right_w = hl.landmark[0]
+    return left_w, right_w
+
+class SwapCounter:
+    """Counts alternating left-up / right-up wrist positions (the 67 gesture)"""
+
+    def __init__(self, now=None):
+        self.last_state = "NEUTRAL"
+        self.cycle_count = 0
+        self.last_move_time = time.time() if now is None else now
+
+    @staticmethod
+    def state(left_y, right_y):
+        mid = (left_y + right_y) / 2
+        l_up = left_y < (mid - SWAP_THRESHOLD)
+        r_up = right_y < (mid - SWAP_THRESHOLD)
+        l_down = left_y > (mid + SWAP_THRESHOLD)
+        r_down = right_y > (mid + SWAP_THRESHOLD)
+
+        curr = "NEUTRAL"
+        if l_up and r_down: curr = "LEFT_UP"
+        elif r_up and l_down: curr = "RIGHT_UP"
+        return curr
+
+    def is_transition(self, left_y, right_y):
+        """Would update() count a rep for these wrist positions"""
+        curr = self.state(left_y, right_y)
+        return curr != "NEUTRAL" and curr != self.last_state
+
+    def update(self, left_y, right_y, now=None):
+        now = time.time() if now is None else now
+
+        curr = self.state(left_y, right_y)
+        if curr != "NEUTRAL" and curr != self.last_state:
+            self.cycle_count += 1
+            self.last_move_time = now
+            self.last_state = curr
+
+        if now - self.last_move_time > RESET_TIME:
+            self.cycle_count = 0
+            self.last_state = "NEUTRAL"
+
+        return self.cycle_count
+
+    @property
+    def done(self):
+        return self.cycle_count >= REQUIRED_REPS
+
+class HandTracker:
+    """Runs hand detection on a padded crop around the last known hands
+
+    The crop only moves when a hand gets near its edge, so MediaPipe's own
+    frame-to-frame tracking inside it stays valid. When the crop doesn't hold
+    both hands any more it falls back to full-frame detection. Landmarks are
+    always returned in full-frame coordinates.
+
+    full_frame_calls and roi_calls count Hands.process calls. Each call may or
+    may not run MediaPipe's palm detector (it reuses its own landmarks between
+    frames) and MediaPipe doesn't expose which, so these are not detector runs.
+    """
+
+    def __init__(self, make_hands, tracking=True, padding=ROI_PADDING):
+        self.full_hands = make_hands()
+        self.roi_hands = make_hands() if tracking else None
+        self.padding = padding
+        self.roi = None         # (x0, y0, x1, y1) pixels, None when not tracking
+        self.full_frame_calls = 0
+        self.roi_calls = 0
+        self.lost = 0
+
+    def hands_box(self, results, W, H):
+        xs = [lm.x for hl in results.multi_hand_landmarks for lm in hl.landmark]
+        ys = [lm.y for hl in results.multi_hand_landmarks for lm in hl.landmark]
+        return min(xs) * W, min(ys) * H, max(xs) * W, max(ys) * H
+
+    def update_roi(self, results, W, H):
+        bx0, by0, bx1, by1 = self.hands_box(results, W, H)
+
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            mx, my = (x1 - x0) * ROI_MARGIN, (y1 - y0) * ROI_MARGIN
+            if bx0 > x0 + mx and by0 > y0 + my and bx1 < x1 - mx and by1 < y1 - my:
+                return  # Still comfortably inside, keep the crop steady
+
+        px, py = (bx1 - bx0) * self.padding, (by1 - by0) * self.padding
+        self.roi = (max(int(bx0 - px), 0), max(int(by0 - py), 0),
+                    min(int(bx1 + px), W), min(int(by1 + py), H))
+
+    def process(self, image_rgb):
+        H, W = image_rgb.shape[:2]
+
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            self.roi_calls += 1
+            results = self.roi_hands.process(np.ascontiguousarray(image_rgb[y0:y1, x0:x1]))
+
+            if results.multi_hand_landmarks and len(results.multi_hand_landmarks) == 2:
+                # Map crop-relative landmarks back onto the full frame
+                cw, ch = x1 - x0, y1 - y0
+                for hl in results.multi_hand_landmarks:
+                    for lm in hl.landmark:
+                        lm.x = (x0 + lm.x * cw) / W
+                        lm.y = (y0 + lm.y * ch) / H
+                self.update_roi(results, W, H)
+                return results
+
+            # Lost one of the hands, look at the whole frame again
+            self.lost += 1
+            self.roi = None
+
+        self.full_frame_calls += 1
+        results = self.full_hands.process(image_rgb)
+        if (self.roi_hands is not None and results.multi_hand_landmarks
+                and len(results.multi_hand_landmarks) == 2):
+            self.update_roi(results, W, H)
+        return results
+
+    def close(self):
+        self.full_hands.close()
+        if self.roi_hands is not None:
+            self.roi_hands.close()
+
+# Hands.process calls and speed of the last perform_67 run
+last_run_stats = {}
+
+def perform_67(tracking=False, draw=True, show=True, capture=None, max_frames=None):
+    """Run the 67 gesture challenge, returns True once it was completed
+
+    tracking:   run Hands on a crop around where the hands were last seen; off by
+                default until it has been measured against a real camera
+    draw:       draw landmarks and hints on the frame (skipped when show is False)
+    show:       open the OpenCV window; False runs headless
+    capture:    anything with cv2.VideoCapture's isOpened/read/release, camera 0 by default
+    max_frames: give up after this many frames instead of waiting for Esc
+    """
+    draw = draw and show
 
     # Check if mediapipe has solutions attribute
     try:
@@ -22,42 +187,23 @@ def perform_67():
         return False
 
     try:
-        hands = mp_hands.Hands(max_num_hands=2, min_detection_confidence=0.7)
+        tracker = HandTracker(lambda: mp_hands.Hands(max_num_hands=2, min_detection_confidence=0.7),
+                              tracking=tracking)
     except Exception as e:
         print(f"Error initializing MediaPipe Hands: {e}")
         return False
 
     # State Variables
-    last_state = "NEUTRAL"
-    cycle_count = 0
-    last_move_time = time.time()
+    counter = SwapCounter()
     success_trigger_time = None  # ### NEW: Tracks when success happened
     challenge_completed = False  # Track if challenge was actually completed
-
-    # --- Validator Function ---
-    def is_valid_hand(landmarks, label):
-        # (Same as your existing function)
-        idx_mcp_y = landmarks.landmark[5].y
-        pinky_mcp_y = landmarks.landmark[17].y
-        
-        if abs(idx_mcp_y - pinky_mcp_y) > FLATNESS_TOLERANCE:
-            return False, "Keep Hand Flat!"
-
-        thumb_tip_x = landmarks.landmark[4].x
-        pinky_tip_x = landmarks.landmark[20].x
-        
-        if label == "Left":
-            if thumb_tip_x > pinky_tip_x: 
-                return False, "Rotate Palm Up"
-        else:
-            if thumb_tip_x < pinky_tip_x:
-                return False, "Rotate Palm Up"
-        return True, "OK"
+    frames = 0
+    loop_start = time.perf_counter()
 
     # --- Main Loop ---
-    cap = cv2.VideoCapture(0)
+    cap = cv2.VideoCapture(0) if capture is None else capture
 
-    while cap.isOpened():
+    while cap.isOpened() and (max_frames is None or frames < max_frames):
         success, image = cap.read()
         if not success: continue
 
@@ -69,9 +215,9 @@ def perform_67():
         if success_trigger_time is not None:
             elapsed = time.time() - success_trigger_time
 
-            # 1. Check if time is up
-            if elapsed > SUCCESS_DISPLAY_DURATION:
-                print("Finished Success Display. Exiting...")
+            # 1. Check if time is up (nothing to show when headless)
+            if elapsed > SUCCESS_DISPLAY_DURATION or not show:
+                metrics.debug("Finished Success Display. Exiting...")
                 challenge_completed = True  # Mark as completed
                 break
             
@@ -88,74 +234,80 @@ def perform_67():
 
         # --- NORMAL DETECTION LOGIC (Only runs if success_trigger_time is None) ---
         image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = hands.process(image_rgb)
+        with metrics.timer("gesture_detect_seconds"):
+            results = tracker.process(image_rgb)
+        metrics.inc("gesture_frames_total")
+        frames += 1
         
         status_text = "Show 2 Hands"
         status_color = (100, 100, 100)
         
         if results.multi_hand_landmarks and len(results.multi_hand_landmarks) == 2:
-            valid_hands_count = 0
-            
-            for idx, hl in enumerate(results.multi_hand_landmarks):
-                lbl = results.multi_handedness[idx].classification[0].label
-                is_good, msg = is_valid_hand(hl, lbl)
-                
-                if is_good:
-                    valid_hands_count += 1
-                    mp_drawing.draw_landmarks(image, hl, mp_hands.HAND_CONNECTIONS)
-                else:
-                    color = (0, 0, 255)
-                    wrist = hl.landmark[0]
-                    cx, cy = int(wrist.x * W), int(wrist.y * H)
-                    cv2.putText(image, msg, (cx - 40, cy + 30), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-                    mp_drawing.draw_landmarks(image, hl, mp_hands.HAND_CONNECTIONS, 
-                                            mp_drawing.DrawingSpec(color=color))
-
-            if valid_hands_count == 2:
-                left_w, right_w = None, None
-                for idx, hl in enumerate(results.multi_hand_landmarks):
-                    lbl = results.multi_handedness[idx].classification[0].label
-                    if lbl == "Left": left_w = hl.landmark[0]
-                    else: right_w = hl.landmark[0]
-                
-                if left_w and right_w:
-                    mid = (left_w.y + right_w.y) / 2
-                    l_up = left_w.y < (mid - SWAP_THRESHOLD)
-                    r_up = right_w.y < (mid - SWAP_THRESHOLD)
-                    l_down = left_w.y > (mid + SWAP_THRESHOLD)
-                    r_down = right_w.y > (mid + SWAP_THRESHOLD)
+            labels = [h.classification[0].label for h in results.multi_handedness]
+            left_w, right_w = wrists(results.multi_hand_landmarks, labels)
 
-                    curr = "NEUTRAL"
-                    if l_up and r_down: curr = "LEFT_UP"
-                    elif r_up and l_down: curr = "RIGHT_UP"
+            # Cheap wrist check first: the hand pose check only changes anything
+            # on frames that would count a rep, or when we draw feedback for it
+            counts_rep = left_w and right_w and counter.is_transition(left_w.y, right_w.y)
+            valid_hands_count = 2
 
-                    if curr != "NEUTRAL" and curr != last_state:
-                        cycle_count += 1
-                        last_move_time = time.time()
-                        last_state = curr
+            if counts_rep or draw:
+                valid_hands_count = 0
+                for hl, lbl in zip(results.multi_hand_landmarks, labels):
+                    is_good, msg = is_valid_hand(hl, lbl)
+                    
+                    if is_good:
+                        valid_hands_count += 1
+                        if draw:
+                            mp_drawing.draw_landmarks(image, hl, mp_hands.HAND_CONNECTIONS)
+                    elif draw:
+                        color = (0, 0, 255)
+                        wrist = hl.landmark[0]
+                        cx, cy = int(wrist.x * W), int(wrist.y * H)
+                        cv2.putText(image, msg, (cx - 40, cy + 30), 
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+                        mp_drawing.draw_landmarks(image, hl, mp_hands.HAND_CONNECTIONS, 
+                                                mp_drawing.DrawingSpec(color=color))
 
-                    if time.time() - last_move_time > RESET_TIME:
-                        cycle_count = 0
-                        last_state = "NEUTRAL"
+            if valid_hands_count == 2:
+                if left_w and right_w:
+                    cycle_count = counter.update(left_w.y, right_w.y)
 
                     status_text = f"Reps: {cycle_count}"
                     status_color = (255, 255, 0)
                     
                     # ### NEW: Trigger Success Mode
-                    if cycle_count >= 2:
+                    if counter.done:
                         success_trigger_time = time.time() # Start the timer
-                        print("67 DETECTED - Starting Cooldown")
+                        metrics.inc("gesture_detections_total")
+                        metrics.debug("67 DETECTED - Starting Cooldown")
                         # No break here! The next loop iteration will catch the success_trigger_time
             else:
                 status_text = "Fix Hand Position!"
                 status_color = (0, 0, 255)
 
-        cv2.putText(image, status_text, (20, 60), cv2.FONT_HERSHEY_PLAIN, 1.5, status_color, 3)
-        cv2.imshow('Flat Hand Detector', image)
-        if cv2.waitKey(5) & 0xFF == 27: break
+        if show:
+            if draw:
+                cv2.putText(image, status_text, (20, 60), cv2.FONT_HERSHEY_PLAIN, 1.5, status_color, 3)
+            cv2.imshow('Flat Hand Detector', image)
+            if cv2.waitKey(5) & 0xFF == 27: break
 
     cap.release()
-    cv2.destroyAllWindows()
+    if show:
+        cv2.destroyAllWindows()
+    tracker.close()
+
+    elapsed = time.perf_counter() - loop_start
+    last_run_stats.clear()
+    last_run_stats.update(frames=frames, fps=frames / elapsed if elapsed else 0.0,
+                          full_frame_process_calls=tracker.full_frame_calls,
+                          roi_process_calls=tracker.roi_calls,
+                          tracking_lost=tracker.lost,
+                          full_frame_rate=tracker.full_frame_calls / frames if frames else 0.0)
+    metrics.inc("gesture_full_frame_process_total", tracker.full_frame_calls)
+    metrics.inc("gesture_roi_process_total", tracker.roi_calls)
+    metrics.debug("Gesture loop: %d frames at %.1f fps, %d full-frame and %d ROI Hands.process "
+                  "calls (tracking lost %d times)", frames, last_run_stats["fps"],
+                  tracker.full_frame_calls, tracker.roi_calls, tracker.lost)
 
-    return challenge_completed
\ No newline at end of file
+    return challenge_completed